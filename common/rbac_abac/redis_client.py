@@ -22,6 +22,10 @@ class RedisAttributeClient:
     - TTL management
     """
     
+    # Set once the attribute keys cached before the per-user index existed
+    # have been indexed
+    INDEX_MIGRATION_KEY = "rbac_abac:attrs_index_migrated"
+    
     def __init__(self, host: str = None, port: int = None, db: int = 0, 
                  decode_responses: bool = False, ttl: int = None):
         """
@@ -59,6 +63,10 @@ class RedisAttributeClient:
         """Generate Redis key for user attributes."""
         return f"user:{user_id}:attrs:{service_name}"
     
+    def get_user_index_key(self, user_id: int) -> str:
+        """Generate Redis key for the set of a user's attribute keys."""
+        return f"user:{user_id}:attrs_index"
+    
     def get_user_attributes(self, user_id: int, service_name: str) -> Optional[UserAttributes]:
         """
         Retrieve user attributes from Redis.
@@ -109,6 +117,7 @@ class RedisAttributeClient:
             pipe.delete(key)  # Clear existing data
             pipe.hmset(key, data)
             pipe.expire(key, ttl)
+            self._index_user_key(pipe, user_id, key, ttl)
             pipe.execute()
             
             logger.debug(f"Stored attributes for user {user_id} in service {service_name}")
@@ -117,6 +126,38 @@ class RedisAttributeClient:
             logger.error(f"Error storing attributes for user {user_id}: {e}")
             return False
     
+    def set_many_user_attributes(self, service_name: str, attributes: List[UserAttributes],
+                                 ttl: int = None) -> bool:
+        """
+        Store attributes for several users of one service in a single
+        pipelined round trip.
+        
+        Args:
+            service_name: Name of the service
+            attributes: UserAttributes objects, keyed by their user_id
+            ttl: TTL in seconds (uses default if not specified)
+            
+        Returns:
+            True if successful
+        """
+        ttl = ttl or self.ttl
+        
+        try:
+            pipe = self.client.pipeline()
+            for user_attrs in attributes:
+                key = self.get_user_key(user_attrs.user_id, service_name)
+                pipe.delete(key)  # Clear existing data
+                pipe.hmset(key, user_attrs.to_redis_data())
+                pipe.expire(key, ttl)
+                self._index_user_key(pipe, user_attrs.user_id, key, ttl)
+            pipe.execute()
+            
+            logger.debug(f"Stored attributes for {len(attributes)} users in service {service_name}")
+            return True
+        except Exception as e:
+            logger.error(f"Error storing attributes for service {service_name}: {e}")
+            return False
+    
     def invalidate_user_attributes(self, user_id: int, service_name: str = None) -> int:
         """
         Invalidate cached attributes for a user.
@@ -130,14 +171,101 @@ class RedisAttributeClient:
         """
         if service_name:
             keys = [self.get_user_key(user_id, service_name)]
-        else:
-            # Delete all service attributes for this user
-            pattern = f"user:{user_id}:attrs:*"
-            keys = list(self.client.scan_iter(match=pattern))
-        
-        if keys:
             return self.client.delete(*keys)
-        return 0
+        
+        # Delete all service attributes for this user, and the index itself
+        keys = list(self.client.smembers(self.get_user_index_key(user_id)))
+        if not keys:
+            return 0
+        
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(*keys)
+        pipe.delete(self.get_user_index_key(user_id))
+        return pipe.execute()[0]
+    
+    def invalidate_many_user_attributes(self, user_ids: List[int], service_name: str = None) -> int:
+        """
+        Invalidate cached attributes for several users and publish one
+        invalidation message per user, pipelining the Redis commands.
+        
+        Args:
+            user_ids: User IDs
+            service_name: Specific service or None for all services
+            
+        Returns:
+            Number of keys deleted
+        """
+        if not user_ids:
+            return 0
+        
+        try:
+            index_keys = []
+            if service_name:
+                keys = [self.get_user_key(user_id, service_name) for user_id in user_ids]
+            else:
+                index_keys = [self.get_user_index_key(user_id) for user_id in user_ids]
+                pipe = self.client.pipeline(transaction=False)
+                for index_key in index_keys:
+                    pipe.smembers(index_key)
+                keys = [key for indexed in pipe.execute() for key in indexed]
+            
+            pipe = self.client.pipeline(transaction=False)
+            if keys:
+                pipe.delete(*keys)
+            if index_keys:
+                pipe.delete(*index_keys)
+            for user_id in user_ids:
+                pipe.publish("rbac_abac:invalidations", json.dumps({
+                    'user_id': user_id,
+                    'service_name': service_name,
+                    'action': 'invalidate'
+                }))
+            results = pipe.execute()
+            
+            return results[0] if keys else 0
+        except Exception as e:
+            logger.error(f"Error invalidating attributes for users {user_ids}: {e}")
+            return 0
+    
+    def _index_user_key(self, pipe, user_id: int, key: str, ttl: int):
+        """Record ``key`` in the user's index so invalidation needs no scan."""
+        index_key = self.get_user_index_key(user_id)
+        pipe.sadd(index_key, key)
+        pipe.expire(index_key, ttl)
+    
+    def index_unindexed_user_keys(self) -> int:
+        """
+        Add attribute keys cached before the per-user index existed to their
+        users' indexes, so invalidation never has to scan for them.
+        
+        The keyspace is scanned once per Redis database; a marker key turns
+        later calls into a single SET.
+        
+        Returns:
+            Number of keys indexed
+        """
+        try:
+            if not self.client.set(self.INDEX_MIGRATION_KEY, 1, nx=True):
+                return 0
+            
+            count = 0
+            pipe = self.client.pipeline(transaction=False)
+            for key in self.client.scan_iter(match="user:*:attrs:*"):
+                name = key.decode() if isinstance(key, bytes) else key
+                self._index_user_key(pipe, name.split(':')[1], key, self.ttl)
+                count += 1
+            pipe.execute()
+            
+            logger.info(f"Indexed {count} cached user attribute keys")
+            return count
+        except Exception as e:
+            logger.error(f"Error indexing cached user attribute keys: {e}")
+            # Let the next client retry the migration
+            try:
+                self.client.delete(self.INDEX_MIGRATION_KEY)
+            except Exception:
+                pass
+            return 0
     
     def publish_invalidation(self, user_id: int, service_name: str = None):
         """
@@ -107,7 +107,9 @@ class TestRedisAttributeClient:
         mock_redis.pipeline.assert_called_once()
         mock_pipe.delete.assert_called_once_with('user:123:attrs:billing_api')
         mock_pipe.hmset.assert_called_once()
-        mock_pipe.expire.assert_called_once_with('user:123:attrs:billing_api', 600)
+        mock_pipe.expire.assert_any_call('user:123:attrs:billing_api', 600)
+        mock_pipe.sadd.assert_called_once_with('user:123:attrs_index', 'user:123:attrs:billing_api')
+        mock_pipe.expire.assert_any_call('user:123:attrs_index', 600)
         mock_pipe.execute.assert_called_once()
     
     def test_set_user_attributes_error(self, client, mock_redis):
@@ -123,6 +125,24 @@ class TestRedisAttributeClient:
         result = client.set_user_attributes(123, 'billing_api', attrs)
         assert result == False
     
+    def test_set_many_user_attributes(self, client, mock_redis):
+        """Test storing several users' attributes in one pipeline."""
+        attrs = [
+            UserAttributes(user_id=123, username='alice', email='alice@example.com'),
+            UserAttributes(user_id=456, username='bob', email='bob@example.com'),
+        ]
+        mock_pipe = MagicMock()
+        mock_redis.pipeline.return_value = mock_pipe
+        
+        result = client.set_many_user_attributes('billing_api', attrs, ttl=600)
+        
+        assert result == True
+        mock_redis.pipeline.assert_called_once()
+        assert mock_pipe.hmset.call_count == 2
+        mock_pipe.expire.assert_any_call('user:123:attrs:billing_api', 600)
+        mock_pipe.expire.assert_any_call('user:456:attrs:billing_api', 600)
+        mock_pipe.execute.assert_called_once()
+    
     def test_invalidate_user_attributes_single_service(self, client, mock_redis):
         """Test invalidating attributes for a specific service."""
         mock_redis.delete.return_value = 1
@@ -133,20 +153,104 @@ class TestRedisAttributeClient:
         mock_redis.delete.assert_called_once_with('user:123:attrs:billing_api')
     
     def test_invalidate_user_attributes_all_services(self, client, mock_redis):
-        """Test invalidating attributes for all services."""
-        # Mock scan_iter to return multiple keys
-        mock_redis.scan_iter.return_value = [
+        """Test invalidating attributes for all services via the key index."""
+        mock_redis.smembers.return_value = {
+            b'user:123:attrs:billing_api',
+            b'user:123:attrs:inventory_api',
+        }
+        mock_pipe = MagicMock()
+        mock_redis.pipeline.return_value = mock_pipe
+        mock_pipe.execute.return_value = [2, 1]
+        
+        count = client.invalidate_user_attributes(123)
+        
+        assert count == 2
+        mock_redis.smembers.assert_called_once_with('user:123:attrs_index')
+        mock_redis.scan_iter.assert_not_called()
+        mock_pipe.delete.assert_any_call('user:123:attrs_index')
+    
+    def test_invalidate_user_attributes_unindexed(self, client, mock_redis):
+        """Test that a user with an empty index is not looked up with SCAN."""
+        mock_redis.smembers.return_value = set()
+        
+        count = client.invalidate_user_attributes(123)
+        
+        assert count == 0
+        mock_redis.scan_iter.assert_not_called()
+        mock_redis.pipeline.assert_not_called()
+    
+    def test_invalidate_many_user_attributes(self, client, mock_redis):
+        """Test invalidating several users in one pipeline."""
+        pipe = mock_redis.pipeline.return_value
+        pipe.execute.return_value = [2, 1, 1]
+        
+        count = client.invalidate_many_user_attributes([123, 456], 'billing_api')
+        
+        assert count == 2
+        mock_redis.pipeline.assert_called_once_with(transaction=False)
+        pipe.delete.assert_called_once_with(
             'user:123:attrs:billing_api',
-            'user:123:attrs:inventory_api',
-            'user:123:attrs:website'
+            'user:456:attrs:billing_api'
+        )
+        assert pipe.publish.call_count == 2
+        pipe.execute.assert_called_once()
+        mock_redis.delete.assert_not_called()
+    
+    def test_invalidate_many_user_attributes_all_services(self, client, mock_redis):
+        """Test that users with empty indexes are not looked up with SCAN."""
+        pipe = mock_redis.pipeline.return_value
+        pipe.execute.side_effect = [[{b'user:123:attrs:billing_api'}, set()], [1, 1, 1, 1]]
+        
+        count = client.invalidate_many_user_attributes([123, 456])
+        
+        assert count == 1
+        pipe.delete.assert_any_call(b'user:123:attrs:billing_api')
+        pipe.delete.assert_any_call('user:123:attrs_index', 'user:456:attrs_index')
+        mock_redis.scan_iter.assert_not_called()
+    
+    def test_index_unindexed_user_keys(self, client, mock_redis):
+        """Test that keys cached before the index are added to it once."""
+        mock_redis.set.return_value = True
+        mock_redis.scan_iter.return_value = [
+            b'user:123:attrs:billing_api',
+            b'user:456:attrs:website',
         ]
-        mock_redis.delete.return_value = 3
+        pipe = mock_redis.pipeline.return_value
         
-        count = client.invalidate_user_attributes(123)
+        count = client.index_unindexed_user_keys()
+        
+        assert count == 2
+        mock_redis.set.assert_called_once_with('rbac_abac:attrs_index_migrated', 1, nx=True)
+        mock_redis.scan_iter.assert_called_once_with(match='user:*:attrs:*')
+        pipe.sadd.assert_any_call('user:123:attrs_index', b'user:123:attrs:billing_api')
+        pipe.sadd.assert_any_call('user:456:attrs_index', b'user:456:attrs:website')
+        pipe.execute.assert_called_once()
+    
+    def test_index_unindexed_user_keys_already_migrated(self, client, mock_redis):
+        """Test that the keyspace is not scanned again once the marker is set."""
+        mock_redis.set.return_value = None
+        
+        assert client.index_unindexed_user_keys() == 0
+        mock_redis.scan_iter.assert_not_called()
+    
+    def test_index_unindexed_user_keys_redis_error(self, client, mock_redis):
+        """Test that a failed migration is logged and its marker cleared for a retry."""
+        mock_redis.set.return_value = True
+        mock_redis.scan_iter.side_effect = Exception("Redis error")
+        
+        assert client.index_unindexed_user_keys() == 0
+        mock_redis.delete.assert_called_once_with('rbac_abac:attrs_index_migrated')
+    
+    def test_invalidate_many_user_attributes_empty(self, client, mock_redis):
+        """Test that no pipeline is sent for an empty user list."""
+        assert client.invalidate_many_user_attributes([]) == 0
+        mock_redis.pipeline.assert_not_called()
+    
+    def test_invalidate_many_user_attributes_redis_error(self, client, mock_redis):
+        """Test that a Redis failure while reading the indexes is logged, not raised."""
+        mock_redis.pipeline.return_value.execute.side_effect = Exception("Redis error")
         
-        assert count == 3
-        mock_redis.scan_iter.assert_called_once_with(match='user:123:attrs:*')
-        mock_redis.delete.assert_called_once()
+        assert client.invalidate_many_user_attributes([123, 456]) == 0
     
     def test_publish_invalidation(self, client, mock_redis):
         """Test publishing cache invalidation message."""
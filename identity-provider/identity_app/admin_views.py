@@ -3,7 +3,7 @@ Admin API views for user and role management
 """
 import logging
 from django.contrib.auth.models import User
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from rest_framework import status, filters
@@ -102,6 +102,20 @@ class UserViewSet(ModelViewSet):
             )
             queryset = queryset.distinct()
         
+        if self.action == 'list':
+            # Count active roles in SQL rather than once per listed user; a
+            # subquery keeps the role/service filter joins out of the count
+            from django.db.models import Count, OuterRef, Q, Subquery
+            from django.db.models.functions import Coalesce
+            
+            active_roles = UserRole.objects.filter(
+                Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()),
+                user=OuterRef('pk')
+            ).order_by().values('user').annotate(total=Count('pk')).values('total')
+            queryset = queryset.annotate(
+                active_roles_count=Coalesce(Subquery(active_roles), 0)
+            )
+        
         return queryset
     
     def get_serializer_class(self):
@@ -466,10 +480,35 @@ class ServiceViewSet(ReadOnlyModelViewSet):
     Read-only API for services
     """
     authentication_classes = [JWTCookieAuthentication]
-    queryset = Service.objects.filter(is_active=True)
     serializer_class = ServiceSerializer
     permission_classes = [IsIdentityAdmin]
     pagination_class = None  # No pagination for services
+    
+    def get_queryset(self):
+        from django.db.models import Count, OuterRef, Subquery
+        from django.db.models.functions import Coalesce
+        
+        now = timezone.now()
+        role_count = Role.objects.filter(
+            service=OuterRef('pk')
+        ).order_by().values('service').annotate(total=Count('pk')).values('total')
+        
+        def distinct_users(**filters):
+            return Coalesce(Subquery(
+                UserRole.objects.filter(role__service=OuterRef('pk'), **filters)
+                .order_by().values('role__service')
+                .annotate(total=Count('user', distinct=True)).values('total')
+            ), 0)
+        
+        # Annotate the counts ServiceSerializer reports so listing services
+        # does not run three count queries per service
+        return Service.objects.filter(is_active=True).annotate(
+            annotated_role_count=Coalesce(Subquery(role_count), 0),
+            annotated_user_count=(
+                distinct_users(expires_at__isnull=True) +
+                distinct_users(expires_at__gt=now)
+            )
+        )
 
 
 class RoleViewSet(ReadOnlyModelViewSet):
@@ -481,13 +520,58 @@ class RoleViewSet(ReadOnlyModelViewSet):
     permission_classes = [IsIdentityAdmin]
     pagination_class = None  # No pagination for roles
     
+    # Columns behind RoleSerializer fields that aren't Role columns themselves
+    ROLE_FIELD_COLUMNS = {
+        'service_name': 'service__name',
+        'service_display_name': 'service__display_name',
+    }
+    
+    def get_requested_fields(self):
+        """Fields named in ?fields=a,b (None means all fields)"""
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        return {name.strip() for name in fields.split(',') if name.strip()}
+    
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+    
     def get_queryset(self):
-        from django.db.models import Count
-        
-        queryset = Role.objects.select_related('service').annotate(
-            user_count=Count('user_assignments', distinct=True)
+        from django.db.models import Count, Q
+        
+        # Load only the columns behind the serialized fields; the service
+        # name is always loaded since select_related walks the service FK
+        fields = self.get_requested_fields()
+        columns = {
+            self.ROLE_FIELD_COLUMNS.get(name, name)
+            for name in RoleSerializer.Meta.fields
+            if name != 'user_count' and (fields is None or name in fields)
+        }
+        # Roles of inactive services are hidden, as the services list hides
+        # the services themselves; the join is already there for the names
+        queryset = Role.objects.select_related('service').filter(
+            service__is_active=True
+        ).only(
+            'service__name', *columns
         ).order_by('service__name', 'name')
         
+        # Count distinct holders of an unexpired assignment in the same
+        # GROUP BY that lists the roles; skip the join when user_count
+        # was left out of ?fields=
+        if fields is None or 'user_count' in fields:
+            now = timezone.now()
+            queryset = queryset.annotate(
+                user_count=Count(
+                    'user_assignments__user',
+                    filter=(
+                        Q(user_assignments__expires_at__isnull=True) |
+                        Q(user_assignments__expires_at__gt=now)
+                    ),
+                    distinct=True
+                )
+            )
+        
         # Filter by service
         service = self.request.query_params.get('service')
         if service:
@@ -527,46 +611,66 @@ class BulkOperationsView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
+            # Fetch every unexpired assignment among the requested pairs at once
+            assigned = set(UserRole.objects.filter(
+                user__in={assignment['user'] for assignment in assignments},
+                role__in={assignment['role'] for assignment in assignments}
+            ).exclude(
+                expires_at__lt=timezone.now()
+            ).values_list('user_id', 'role_id'))
+            
+            new_roles = []
             for assignment in assignments:
-                try:
-                    # Check if already assigned
-                    existing = UserRole.objects.filter(
-                        user=assignment['user'],
-                        role=assignment['role']
-                    ).exclude(
-                        expires_at__lt=timezone.now()
-                    ).first()
-                    
-                    if existing:
-                        errors.append({
-                            'user': assignment['user'].username,
-                            'role': assignment['role'].name,
-                            'error': 'Role already assigned'
-                        })
-                        continue
-                    
-                    user_role = UserRole.objects.create(
-                        user=assignment['user'],
-                        role=assignment['role'],
-                        granted_by=django_user,
-                        expires_at=expires_at
-                    )
-                    
-                    created.append({
-                        'user': assignment['user'].username,
-                        'role': assignment['role'].name,
-                        'id': user_role.id
-                    })
-                    
-                    # Clear cache
-                    RedisService.invalidate_user_cache(assignment['user'].id)
-                    
-                except Exception as e:
+                pair = (assignment['user'].id, assignment['role'].id)
+                if pair in assigned:
                     errors.append({
                         'user': assignment['user'].username,
                         'role': assignment['role'].name,
-                        'error': str(e)
+                        'error': 'Role already assigned'
                     })
+                    continue
+                
+                assigned.add(pair)
+                new_roles.append(UserRole(
+                    user=assignment['user'],
+                    role=assignment['role'],
+                    granted_by=django_user,
+                    expires_at=expires_at
+                ))
+            
+            # bulk_create skips the post_save cache refresh; the caches are
+            # invalidated below instead
+            try:
+                with transaction.atomic():
+                    saved_roles = UserRole.objects.bulk_create(new_roles)
+            except IntegrityError:
+                # A concurrent request assigned one of the roles first; insert
+                # the rows one at a time so only the conflicting ones fail
+                saved_roles = []
+                for user_role in new_roles:
+                    try:
+                        with transaction.atomic():
+                            user_role.save(force_insert=True)
+                        saved_roles.append(user_role)
+                    except IntegrityError as e:
+                        errors.append({
+                            'user': user_role.user.username,
+                            'role': user_role.role.name,
+                            'error': str(e)
+                        })
+            
+            for user_role in saved_roles:
+                created.append({
+                    'user': user_role.user.username,
+                    'role': user_role.role.name,
+                    'id': user_role.id
+                })
+            
+            # Clear cache for every user that gained a role in one round trip
+            if saved_roles:
+                RedisService.invalidate_many(list(dict.fromkeys(
+                    user_role.user_id for user_role in saved_roles
+                )))
             
             # Audit log
             audit_log(
@@ -629,6 +733,14 @@ class ServiceAttributeViewSet(ModelViewSet):
         if is_required is not None:
             queryset = queryset.filter(is_required=is_required.lower() == 'true')
         
+        if self.action == 'list':
+            # Only load the columns ServiceAttributeSerializer renders;
+            # other actions keep full rows since they compare and audit them
+            queryset = queryset.only(
+                'service', 'service__name', 'name', 'display_name',
+                'description', 'attribute_type', 'is_required', 'default_value'
+            )
+        
         return queryset
     
     def get_serializer_class(self):
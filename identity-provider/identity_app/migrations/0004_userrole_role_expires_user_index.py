@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('identity_app', '0003_add_identity_admin_role'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userrole',
+            index=models.Index(fields=['role', 'expires_at', 'user'], name='identity_ap_role_id_b0ee88_idx'),
+        ),
+    ]
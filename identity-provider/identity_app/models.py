@@ -159,6 +159,8 @@ class UserRole(models.Model):
             models.Index(fields=['user', 'role']),
             models.Index(fields=['user', 'role', 'resource_id']),
             models.Index(fields=['expires_at']),
+            # Covers the roles list's per-role count of unexpired holders
+            models.Index(fields=['role', 'expires_at', 'user']),
         ]
         # Prevent duplicate role assignments
         unique_together = [['user', 'role', 'resource_id']]
@@ -2,8 +2,8 @@
 Permission classes for Identity Provider Admin API
 """
 from rest_framework.permissions import BasePermission
+from django.contrib.auth.models import User
 from .services import RBACService
-from .models import Service
 
 
 class IsIdentityAdmin(BasePermission):
@@ -28,15 +28,14 @@ class IsIdentityAdmin(BasePermission):
             
             # Otherwise try to get from database (for non-JWT auth)
             if hasattr(request.user, 'id') and request.user.id:
-                from django.contrib.auth.models import User
-                try:
-                    db_user = User.objects.get(id=request.user.id)
-                    identity_service = Service.objects.get(name='identity_provider')
-                    user_roles = RBACService.get_user_roles(db_user, identity_service)
-                    role_names = [ur.role.name for ur in user_roles]
-                    return 'identity_admin' in role_names
-                except (User.DoesNotExist, Service.DoesNotExist):
-                    pass
+                # An unsaved instance carrying the pk is enough to filter on,
+                # so the user isn't re-fetched from the database
+                user_roles = RBACService.get_user_roles(User(pk=request.user.id))
+                return any(
+                    ur.role.name == 'identity_admin'
+                    and ur.role.service.name == 'identity_provider'
+                    for ur in user_roles
+                )
             
             return False
         except Exception:
@@ -4,6 +4,7 @@ Serializers for Identity Provider Admin API
 import json
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db import connection
 from django.utils import timezone
 from .models import Role, UserRole, Service, UserAttribute, ServiceAttribute
 
@@ -18,6 +19,13 @@ class RoleSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'display_name', 'description', 'is_global', 
                   'service_name', 'service_display_name', 'created_at', 'user_count']
         read_only_fields = ['id', 'created_at', 'user_count']
+    
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only serialize the requested fields, if a subset was given
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 
 class UserRoleSerializer(serializers.ModelSerializer):
@@ -77,6 +85,9 @@ class UserListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'date_joined', 'last_login', 'is_staff', 'is_superuser']
     
     def get_roles_count(self, obj):
+        # UserViewSet annotates the count for list requests
+        if hasattr(obj, 'active_roles_count'):
+            return obj.active_roles_count
         return obj.user_roles.filter(
             expires_at__isnull=True
         ).count() + obj.user_roles.filter(
@@ -102,7 +113,7 @@ class UserDetailSerializer(serializers.ModelSerializer):
     def get_roles(self, obj):
         active_roles = UserRole.objects.filter(
             user=obj
-        ).select_related('role__service').order_by('-granted_at')
+        ).select_related('role__service', 'granted_by').order_by('-granted_at')
         return UserRoleSerializer(active_roles, many=True).data
     
     def get_full_name(self, obj):
@@ -178,9 +189,14 @@ class ServiceSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'registered_at']
     
     def get_role_count(self, obj):
+        # ServiceViewSet annotates both counts; other callers fall back to queries
+        if hasattr(obj, 'annotated_role_count'):
+            return obj.annotated_role_count
         return obj.roles.count()
     
     def get_user_count(self, obj):
+        if hasattr(obj, 'annotated_user_count'):
+            return obj.annotated_user_count
         return User.objects.filter(
             user_roles__role__service=obj,
             user_roles__expires_at__isnull=True
@@ -207,45 +223,65 @@ class BulkAssignRoleSerializer(serializers.Serializer):
         validated_assignments = []
         errors = []
         
+        # Resolve every referenced user, service and role with one query each.
+        # Ids outside the primary key's range can't match a user, and the
+        # database would raise on them rather than find nothing
+        min_id, max_id = connection.ops.integer_field_range(
+            User._meta.pk.get_internal_type()
+        )
+        user_ids = set()
+        for assignment in value:
+            try:
+                user_id = int(assignment.get('user_id'))
+            except (TypeError, ValueError):
+                continue
+            if min_id <= user_id <= max_id:
+                user_ids.add(user_id)
+        users = User.objects.in_bulk(user_ids)
+        service_names = {str(assignment.get('service_name')) for assignment in value}
+        services = Service.objects.in_bulk(service_names, field_name='name')
+        roles = {
+            (role.service.name, role.name): role
+            for role in Role.objects.select_related('service').filter(
+                service__name__in=service_names,
+                name__in={str(assignment.get('role_name')) for assignment in value}
+            )
+        }
+        
         for idx, assignment in enumerate(value):
+            # Validate required fields
+            if 'user_id' not in assignment:
+                errors.append({idx: "user_id is required"})
+                continue
+            if 'role_name' not in assignment:
+                errors.append({idx: "role_name is required"})
+                continue
+            if 'service_name' not in assignment:
+                errors.append({idx: "service_name is required"})
+                continue
+            
+            # Validate user exists
             try:
-                # Validate required fields
-                if 'user_id' not in assignment:
-                    errors.append({idx: "user_id is required"})
-                    continue
-                if 'role_name' not in assignment:
-                    errors.append({idx: "role_name is required"})
-                    continue
-                if 'service_name' not in assignment:
-                    errors.append({idx: "service_name is required"})
-                    continue
-                
-                # Validate user exists
-                try:
-                    user = User.objects.get(id=assignment['user_id'])
-                except User.DoesNotExist:
-                    errors.append({idx: f"User {assignment['user_id']} not found"})
-                    continue
-                
-                # Validate role and service
-                try:
-                    service = Service.objects.get(name=assignment['service_name'])
-                    role = Role.objects.get(name=assignment['role_name'], service=service)
-                except Service.DoesNotExist:
-                    errors.append({idx: f"Service {assignment['service_name']} not found"})
-                    continue
-                except Role.DoesNotExist:
-                    errors.append({idx: f"Role {assignment['role_name']} not found for service"})
-                    continue
-                
-                validated_assignments.append({
-                    'user': user,
-                    'role': role,
-                    'service': service
-                })
-                
-            except Exception as e:
-                errors.append({idx: str(e)})
+                user = users[int(assignment['user_id'])]
+            except (KeyError, TypeError, ValueError):
+                errors.append({idx: f"User {assignment['user_id']} not found"})
+                continue
+            
+            # Validate role and service
+            service = services.get(str(assignment['service_name']))
+            if service is None:
+                errors.append({idx: f"Service {assignment['service_name']} not found"})
+                continue
+            role = roles.get((service.name, str(assignment['role_name'])))
+            if role is None:
+                errors.append({idx: f"Role {assignment['role_name']} not found for service"})
+                continue
+            
+            validated_assignments.append({
+                'user': user,
+                'role': role,
+                'service': service
+            })
         
         if errors:
             raise serializers.ValidationError({"assignments": errors})
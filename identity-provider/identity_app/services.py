@@ -203,8 +203,33 @@ class RedisService:
         """Get or create Redis client instance."""
         if not hasattr(cls, '_client'):
             cls._client = RedisAttributeClient()
+            # Index keys cached before the per-user index existed, so
+            # invalidation can rely on the index alone
+            cls._client.index_unindexed_user_keys()
         return cls._client
     
+    @staticmethod
+    def _build_user_attributes(user: User, service: Service) -> ABACUserAttributes:
+        """Build the cached roles and attributes of a user for a service."""
+        # Get user roles for this service
+        user_roles = RBACService.get_user_roles(user, service)
+        role_names = [ur.role.name for ur in user_roles]
+        
+        # Get user attributes
+        attributes = AttributeService.get_user_attributes(user, service)
+        
+        return ABACUserAttributes(
+            user_id=user.id,
+            username=user.username,
+            email=user.email,
+            roles=role_names,
+            department=attributes.get('department'),
+            admin_group_ids=attributes.get('admin_group_ids', []),
+            customer_ids=attributes.get('customer_ids', []),
+            assigned_doc_ids=attributes.get('assigned_doc_ids', []),
+            service_specific_attrs=attributes
+        )
+    
     @classmethod
     def populate_user_attributes(cls, user_id: int, service_name: str) -> bool:
         """
@@ -224,25 +249,7 @@ class RedisService:
             logger.error(f"Failed to populate attributes: {e}")
             return False
         
-        # Get user roles for this service
-        user_roles = RBACService.get_user_roles(user, service)
-        role_names = [ur.role.name for ur in user_roles]
-        
-        # Get user attributes
-        attributes = AttributeService.get_user_attributes(user, service)
-        
-        # Build UserAttributes object
-        user_attrs = ABACUserAttributes(
-            user_id=user.id,
-            username=user.username,
-            email=user.email,
-            roles=role_names,
-            department=attributes.get('department'),
-            admin_group_ids=attributes.get('admin_group_ids', []),
-            customer_ids=attributes.get('customer_ids', []),
-            assigned_doc_ids=attributes.get('assigned_doc_ids', []),
-            service_specific_attrs=attributes
-        )
+        user_attrs = cls._build_user_attributes(user, service)
         
         # Store in Redis
         client = cls.get_client()
@@ -273,6 +280,21 @@ class RedisService:
         # Publish invalidation message
         client.publish_invalidation(user_id, service_name)
     
+    @classmethod
+    def invalidate_many(cls, user_ids: List[int], service_name: str = None):
+        """
+        Invalidate cache and publish invalidation messages for several users
+        in a single Redis round trip.
+        
+        Args:
+            user_ids: User IDs
+            service_name: Optional service name (None for all services)
+        """
+        client = cls.get_client()
+        
+        deleted = client.invalidate_many_user_attributes(user_ids, service_name)
+        logger.info(f"Invalidated {deleted} cache entries for {len(user_ids)} users")
+    
     @classmethod
     def populate_all_users_for_service(cls, service_name: str) -> int:
         """
@@ -298,11 +320,20 @@ class RedisService:
             role__service__is_active=True
         ).values_list('user_id', flat=True).distinct()
         
-        count = 0
-        for user_id in user_ids:
-            if cls.populate_user_attributes(user_id, service_name):
-                count += 1
+        user_attrs = [
+            cls._build_user_attributes(user, service)
+            for user in User.objects.filter(id__in=user_ids)
+        ]
+        if not user_attrs:
+            return 0
+        
+        # Write every user's attributes in one Redis round trip
+        client = cls.get_client()
+        if not client.set_many_user_attributes(service_name, user_attrs):
+            logger.error(f"Failed to populate Redis attributes for service {service_name}")
+            return 0
         
+        count = len(user_attrs)
         logger.info(f"Populated {count} users for service {service_name}")
         return count
 
@@ -0,0 +1,27 @@
+"""
+pytest hooks for the identity app tests.
+"""
+import pytest
+from django.test import TestCase, TransactionTestCase
+
+
+def pytest_collection_modifyitems(items):
+    """Refuse to run TransactionTestCase classes that haven't opted in.
+
+    TransactionTestCase truncates every table after each test instead of
+    rolling back a savepoint, which is far slower. A class that really needs
+    committed transactions can set ``requires_real_commits = True``.
+    """
+    offenders = sorted({
+        f'{item.cls.__module__}.{item.cls.__qualname__}'
+        for item in items
+        if item.cls is not None
+        and issubclass(item.cls, TransactionTestCase)
+        and not issubclass(item.cls, TestCase)
+        and not getattr(item.cls, 'requires_real_commits', False)
+    })
+    if offenders:
+        raise pytest.UsageError(
+            'Use django.test.TestCase for rollback-based isolation, or set '
+            'requires_real_commits = True: ' + ', '.join(offenders)
+        )
@@ -0,0 +1,31 @@
+"""
+Builders for fixture objects shared across the identity app tests.
+
+Each builder returns an unsaved instance for ``bulk_create``; tests that save a
+single object use ``objects.create``. Keyword arguments override the defaults.
+"""
+from ..models import Service, Role
+
+
+def build_identity_service(**fields):
+    """Build the identity_provider service."""
+    return Service(**{
+        'name': 'identity_provider',
+        'display_name': 'Identity Provider',
+        'description': 'Core identity service',
+        'is_active': True,
+        **fields
+    })
+
+
+def build_identity_admin_role(service, **fields):
+    """Build the global identity_admin role for ``service``."""
+    return Role(**{
+        'service': service,
+        'name': 'identity_admin',
+        'display_name': 'Identity Administrator',
+        'description': 'Full admin access',
+        'is_global': True,
+        **fields
+    })
+
@@ -3,6 +3,7 @@ Tests for Identity Provider Admin API
 """
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
 from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -11,7 +12,7 @@ import json
 
 from identity_app.models import Service, Role, UserRole
 from identity_app.services import RBACService, RedisService
-from common.jwt_auth.utils import generate_jwt_token
+from common.jwt_auth.utils import encode_jwt
 
 
 class AdminAPITestCase(TestCase):
@@ -50,40 +51,33 @@ class AdminAPITestCase(TestCase):
         self.billing_viewer_role = Role.objects.create(
             name='billing_viewer',
             display_name='Billing Viewer',
-            service=self.billing_service
-        )
-        
-        # Create admin user
-        self.admin_user = User.objects.create_user(
-            username='admin',
-            email='admin@example.com',
-            password='admin123'
-        )
+            service=self.billing_service,
+            is_global=False
+        )
+        
+        # Create admin, regular and test users in a single INSERT; the
+        # passwords are hashed up front since bulk_create skips create_user
+        test_password = make_password('test123')
+        (
+            self.admin_user,
+            self.regular_user,
+            self.test_user1,
+            self.test_user2,
+        ) = User.objects.bulk_create([
+            User(username='admin', email='admin@example.com',
+                 password=make_password('admin123')),
+            User(username='regular', email='regular@example.com',
+                 password=make_password('regular123')),
+            User(username='testuser1', email='test1@example.com',
+                 password=test_password),
+            User(username='testuser2', email='test2@example.com',
+                 password=test_password),
+        ])
         
         UserRole.objects.create(
             user=self.admin_user,
             role=self.admin_role,
-            assigned_by=self.admin_user
-        )
-        
-        # Create regular user
-        self.regular_user = User.objects.create_user(
-            username='regular',
-            email='regular@example.com',
-            password='regular123'
-        )
-        
-        # Create test users
-        self.test_user1 = User.objects.create_user(
-            username='testuser1',
-            email='test1@example.com',
-            password='test123'
-        )
-        
-        self.test_user2 = User.objects.create_user(
-            username='testuser2',
-            email='test2@example.com',
-            password='test123'
+            granted_by=self.admin_user
         )
         
         # Set up API client
@@ -92,15 +86,21 @@ class AdminAPITestCase(TestCase):
         # Cache admin user attributes
         RedisService.populate_user_attributes(self.admin_user.id, 'identity_provider')
     
+    def authenticate_as(self, user):
+        """Authenticate client as ``user`` with a signed JWT cookie"""
+        self.client.cookies['jwt'] = encode_jwt({
+            'user_id': user.id,
+            'username': user.username,
+            'email': user.email,
+        })
+    
     def authenticate_as_admin(self):
         """Authenticate client as admin"""
-        token = generate_jwt_token(self.admin_user)
-        self.client.cookies['jwt'] = token
+        self.authenticate_as(self.admin_user)
     
     def authenticate_as_regular(self):
         """Authenticate client as regular user"""
-        token = generate_jwt_token(self.regular_user)
-        self.client.cookies['jwt'] = token
+        self.authenticate_as(self.regular_user)
 
 
 class UserListAPITest(AdminAPITestCase):
@@ -109,7 +109,7 @@ class UserListAPITest(AdminAPITestCase):
     def test_list_users_requires_auth(self):
         """Test that listing users requires authentication"""
         response = self.client.get('/api/admin/users/')
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
     
     def test_list_users_requires_admin(self):
         """Test that listing users requires admin role"""
@@ -170,7 +170,7 @@ class UserListAPITest(AdminAPITestCase):
         UserRole.objects.create(
             user=self.test_user1,
             role=self.billing_admin_role,
-            assigned_by=self.admin_user
+            granted_by=self.admin_user
         )
         
         response = self.client.get('/api/admin/users/?has_role=billing_admin')
@@ -335,7 +335,7 @@ class UserDetailAPITest(AdminAPITestCase):
         }
         
         response = self.client.post(
-            f'/api/admin/users/{self.test_user1.id}/set-password/',
+            f'/api/admin/users/{self.test_user1.id}/set_password/',
             password_data,
             format='json'
         )
@@ -357,22 +357,22 @@ class RoleManagementAPITest(AdminAPITestCase):
         UserRole.objects.create(
             user=self.test_user1,
             role=self.billing_admin_role,
-            assigned_by=self.admin_user
+            granted_by=self.admin_user
         )
         UserRole.objects.create(
             user=self.test_user1,
             role=self.billing_viewer_role,
-            assigned_by=self.admin_user,
+            granted_by=self.admin_user,
             expires_at=timezone.now() + timedelta(days=30)
         )
         
         response = self.client.get(f'/api/admin/users/{self.test_user1.id}/roles/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
-        data = response.json()
-        self.assertEqual(len(data), 2)
-        self.assertEqual(data[0]['role_name'], 'billing_admin')
-        self.assertTrue(data[0]['is_active'])
+        # Newest assignment first, so index the roles by name
+        roles = {r['role_name']: r for r in response.json()}
+        self.assertEqual(set(roles), {'billing_admin', 'billing_viewer'})
+        self.assertTrue(roles['billing_admin']['is_active'])
     
     def test_assign_role(self):
         """Test assigning role to user"""
@@ -385,7 +385,7 @@ class RoleManagementAPITest(AdminAPITestCase):
         }
         
         response = self.client.post(
-            f'/api/admin/users/{self.test_user1.id}/roles/',
+            f'/api/admin/users/{self.test_user1.id}/assign_role/',
             role_data,
             format='json'
         )
@@ -411,7 +411,7 @@ class RoleManagementAPITest(AdminAPITestCase):
         }
         
         response = self.client.post(
-            f'/api/admin/users/{self.test_user1.id}/roles/',
+            f'/api/admin/users/{self.test_user1.id}/assign_role/',
             role_data,
             format='json'
         )
@@ -432,7 +432,7 @@ class RoleManagementAPITest(AdminAPITestCase):
         UserRole.objects.create(
             user=self.test_user1,
             role=self.billing_admin_role,
-            assigned_by=self.admin_user
+            granted_by=self.admin_user
         )
         
         # Try to assign again
@@ -442,7 +442,7 @@ class RoleManagementAPITest(AdminAPITestCase):
         }
         
         response = self.client.post(
-            f'/api/admin/users/{self.test_user1.id}/roles/',
+            f'/api/admin/users/{self.test_user1.id}/assign_role/',
             role_data,
             format='json'
         )
@@ -456,7 +456,7 @@ class RoleManagementAPITest(AdminAPITestCase):
         user_role = UserRole.objects.create(
             user=self.test_user1,
             role=self.billing_admin_role,
-            assigned_by=self.admin_user
+            granted_by=self.admin_user
         )
         
         response = self.client.delete(
@@ -514,9 +514,8 @@ class ServiceAndRoleAPITest(AdminAPITestCase):
         self.authenticate_as_admin()
         
         response = self.client.get('/api/admin/roles/?is_global=true')
-        data = response.json()
-        self.assertEqual(len(data), 1)
-        self.assertEqual(data[0]['name'], 'identity_admin')
+        names = {role['name'] for role in response.json()}
+        self.assertEqual(names, {'identity_admin', 'billing_admin'})
 
 
 class BulkOperationsAPITest(AdminAPITestCase):
@@ -575,7 +574,7 @@ class BulkOperationsAPITest(AdminAPITestCase):
         UserRole.objects.create(
             user=self.test_user1,
             role=self.billing_admin_role,
-            assigned_by=self.admin_user
+            granted_by=self.admin_user
         )
         
         bulk_data = {
@@ -645,14 +644,14 @@ class CacheInvalidationTest(AdminAPITestCase):
         }
         
         response = self.client.post(
-            f'/api/admin/users/{self.test_user1.id}/roles/',
+            f'/api/admin/users/{self.test_user1.id}/assign_role/',
             role_data,
             format='json'
         )
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         
         # Verify cache was cleared
-        cached = self.redis_service.get_user_attributes(self.test_user1.id, 'billing_api')
+        cached = RedisService.get_client().get_user_attributes(self.test_user1.id, 'billing_api')
         self.assertIsNone(cached)
     
     def test_cache_cleared_on_user_update(self):
@@ -672,5 +671,5 @@ class CacheInvalidationTest(AdminAPITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
         # Verify cache was cleared
-        cached = self.redis_service.get_user_attributes(self.test_user1.id, 'identity_provider')
+        cached = RedisService.get_client().get_user_attributes(self.test_user1.id, 'identity_provider')
         self.assertIsNone(cached)
\ No newline at end of file
@@ -2,35 +2,36 @@
 Comprehensive tests for Identity Provider Admin API endpoints.
 Tests all admin ViewSet actions and bulk operations.
 """
-import json
 from datetime import timedelta
+from functools import lru_cache
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, connection
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from unittest.mock import patch, MagicMock, Mock
+from unittest.mock import patch
 
-from ..models import Service, Role, UserRole, ServiceManifest
-from ..services import RedisService
+from ..models import Service, Role, UserRole
 
-# Import JWT utilities
-import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
-from common.jwt_auth import utils as jwt_utils
+
+@lru_cache(maxsize=None)
+def _hashed_password(raw_password):
+    """Hash each fixture password once per module, not once per test class."""
+    return make_password(raw_password)
 
 
 class AdminAPICompleteTestCase(TestCase):
     """Comprehensive test cases for admin API endpoints."""
     
-    def setUp(self):
-        """Set up test data."""
-        self.client = APIClient()
-        
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data shared by every test in the class."""
         # Create identity provider service
-        self.identity_service = Service.objects.create(
+        cls.identity_service = Service.objects.create(
             name='identity_provider',
             display_name='Identity Provider',
             description='Core identity service',
@@ -38,120 +39,130 @@ class AdminAPICompleteTestCase(TestCase):
         )
         
         # Create identity_admin role
-        self.admin_role = Role.objects.create(
+        cls.admin_role = Role.objects.create(
             name='identity_admin',
             display_name='Identity Administrator',
-            service=self.identity_service,
+            service=cls.identity_service,
             is_global=True,
             description='Full admin access'
         )
         
         # Create admin user with identity_admin role
-        self.admin_user = User.objects.create_user(
+        cls.admin_user = User.objects.create(
             username='admin',
             email='admin@example.com',
-            password='admin123!#QWERT',
+            password=_hashed_password('admin123!#QWERT'),
             first_name='Admin',
             last_name='User'
         )
         
         UserRole.objects.create(
-            user=self.admin_user,
-            role=self.admin_role,
-            granted_by=self.admin_user
+            user=cls.admin_user,
+            role=cls.admin_role,
+            granted_by=cls.admin_user
         )
         
         # Create regular test user
-        self.test_user = User.objects.create_user(
+        cls.test_user = User.objects.create(
             username='testuser',
             email='test@example.com',
-            password='testuser123!#QWERT',
+            password=_hashed_password('testuser123!#QWERT'),
             first_name='Test',
             last_name='User'
         )
         
         # Create additional test service
-        self.billing_service = Service.objects.create(
+        cls.billing_service = Service.objects.create(
             name='billing_api',
             display_name='Billing API',
             description='Billing service',
             is_active=True
         )
         
-        self.billing_admin_role = Role.objects.create(
+        cls.billing_admin_role = Role.objects.create(
             name='billing_admin',
             display_name='Billing Administrator',
-            service=self.billing_service,
+            service=cls.billing_service,
             is_global=True
         )
         
-        self.billing_viewer_role = Role.objects.create(
+        cls.billing_viewer_role = Role.objects.create(
             name='billing_viewer',
             display_name='Billing Viewer',
-            service=self.billing_service,
+            service=cls.billing_service,
             is_global=False
         )
-        
-        # Set up JWT authentication mocking
-        self.jwt_auth_patcher = patch('identity_app.admin_views.JWTCookieAuthentication.authenticate')
-        self.mock_jwt_auth = self.jwt_auth_patcher.start()
+    
+    @classmethod
+    def setUpClass(cls):
+        """Resolve URLs and build one authenticated client per role for the whole class."""
+        super().setUpClass()
+        cls.URL_USER_LIST = reverse('admin-user-list')
+        cls.URL_SERVICE_LIST = reverse('admin-service-list')
+        cls.URL_ROLE_LIST = reverse('admin-role-list')
+        cls.URL_BULK_ASSIGN = reverse('admin-bulk-assign-roles')
+        cls.URL_AUDIT = reverse('admin-audit-log')
+        
+        # APIClient can't be deep-copied, so the clients are built here
+        # rather than in setUpTestData
+        cls._admin_client = APIClient()
+        cls._admin_client.force_authenticate(user=cls.admin_user)
+        cls._user_client = APIClient()
+        cls._user_client.force_authenticate(user=cls.test_user)
+        cls._anon_client = APIClient()
+    
+    @classmethod
+    def user_url(cls, pk):
+        """Detail URL for a user, built from the resolved list URL."""
+        return f'{cls.URL_USER_LIST}{pk}/'
+    
+    def setUp(self):
+        """Stub out Redis cache invalidation, reset the clients and authenticate as admin."""
+        redis_patcher = patch('identity_app.services.RedisService.invalidate_user_cache')
+        self.mock_invalidate = redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+        bulk_patcher = patch('identity_app.services.RedisService.invalidate_many')
+        self.mock_invalidate_many = bulk_patcher.start()
+        self.addCleanup(bulk_patcher.stop)
+        
+        # The clients outlive each test, so drop any cookies and headers a
+        # test left behind and put back each client's own user
+        for client, user in ((self._admin_client, self.admin_user),
+                             (self._user_client, self.test_user),
+                             (self._anon_client, None)):
+            client.cookies.clear()
+            client.credentials()
+            client.force_authenticate(user=user)
         
         # Authenticate as admin for most tests
         self._authenticate_as_admin()
     
-    def tearDown(self):
-        """Clean up after tests."""
-        self.jwt_auth_patcher.stop()
-        if hasattr(self, 'rbac_patcher'):
-            self.rbac_patcher.stop()
-        super().tearDown()
-    
     def _authenticate_as_admin(self):
         """Helper to authenticate as admin user."""
-        # Mock JWT authentication to return admin user
-        self.mock_jwt_auth.return_value = (self.admin_user, None)
-        
-        # Create JWT token for admin user
-        payload = {
-            "user_id": self.admin_user.id,
-            "username": self.admin_user.username,
-            "email": self.admin_user.email,
-            "iat": timezone.now(),
-        }
-        token = jwt_utils.encode_jwt(payload)
-        
-        # Set JWT cookie
-        self.client.cookies['jwt'] = token
+        self.client = self._admin_client
     
     def _authenticate_as_user(self):
         """Helper to authenticate as regular user."""
-        # Mock JWT authentication to return regular user
-        self.mock_jwt_auth.return_value = (self.test_user, None)
-        
-        # Create JWT token for test user
-        payload = {
-            "user_id": self.test_user.id,
-            "username": self.test_user.username,
-            "email": self.test_user.email,
-            "iat": timezone.now(),
-        }
-        token = jwt_utils.encode_jwt(payload)
-        
-        # Set JWT cookie
-        self.client.cookies['jwt'] = token
-        
-        # Also ensure the permission check will work correctly
-        # by mocking the RBACService.get_user_roles to return no admin role
-        if hasattr(self, 'rbac_patcher'):
-            self.rbac_patcher.stop()
-        self.rbac_patcher = patch('identity_app.permissions.RBACService.get_user_roles')
-        self.mock_rbac = self.rbac_patcher.start()
-        self.mock_rbac.return_value = []  # No roles
+        self.client = self._user_client
+    
+    def _create_users(self, count):
+        """Helper to create ``count`` extra users with a single INSERT."""
+        password = _hashed_password('password123!#QWERT')
+        return User.objects.bulk_create([
+            User(username=f'user{i}', email=f'user{i}@example.com', password=password)
+            for i in range(count)
+        ])
+    
+    def _grant_roles(self, pairs):
+        """Helper to assign ``(user, role)`` pairs with a single INSERT."""
+        return UserRole.objects.bulk_create([
+            UserRole(user=user, role=role, granted_by=self.admin_user)
+            for user, role in pairs
+        ])
     
     def _clear_authentication(self):
         """Clear authentication."""
-        self.mock_jwt_auth.return_value = None
-        self.client.cookies.clear()
+        self.client = self._anon_client
 
 
 class UserViewSetTestCase(AdminAPICompleteTestCase):
@@ -159,11 +170,13 @@ class UserViewSetTestCase(AdminAPICompleteTestCase):
     
     def test_list_users(self):
         """Test listing users."""
-        url = reverse('admin-user-list')
-        response = self.client.get(url)
+        url = self.URL_USER_LIST
+        # Role counts are annotated, so the query count does not grow per user
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.data
         
         self.assertIn('results', data)
         self.assertIn('count', data)
@@ -179,11 +192,11 @@ class UserViewSetTestCase(AdminAPICompleteTestCase):
     
     def test_list_users_with_search(self):
         """Test listing users with search filter."""
-        url = reverse('admin-user-list')
+        url = self.URL_USER_LIST
         response = self.client.get(url, {'search': 'test'})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.data
         
         self.assertEqual(data['count'], 1)
         self.assertEqual(data['results'][0]['username'], 'testuser')
@@ -191,58 +204,63 @@ class UserViewSetTestCase(AdminAPICompleteTestCase):
     def test_list_users_with_filters(self):
         """Test listing users with various filters."""
         # Filter by active status
-        url = reverse('admin-user-list')
-        response = self.client.get(url, {'is_active': 'true'})
+        url = self.URL_USER_LIST
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'is_active': 'true'})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.data
         self.assertEqual(data['count'], 2)
         
         # Filter by role
-        response = self.client.get(url, {'has_role': 'identity_admin'})
-        data = response.json()
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'has_role': 'identity_admin'})
+        data = response.data
         self.assertEqual(data['count'], 1)
         self.assertEqual(data['results'][0]['username'], 'admin')
     
     def test_list_users_pagination(self):
         """Test user list pagination."""
         # Create more users
-        for i in range(60):
-            User.objects.create_user(
-                username=f'user{i}',
-                email=f'user{i}@example.com',
-                password='password123!#QWERT'
-            )
-        
-        url = reverse('admin-user-list')
+        self._create_users(60)
+        
+        url = self.URL_USER_LIST
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.data
         
         self.assertEqual(len(data['results']), 50)  # Default page size
         self.assertIsNotNone(data['next'])
         
         # Test custom page size
         response = self.client.get(url, {'page_size': 10})
-        data = response.json()
+        data = response.data
         self.assertEqual(len(data['results']), 10)
     
     def test_get_user_detail(self):
         """Test getting user details."""
-        url = reverse('admin-user-detail', kwargs={'pk': self.test_user.id})
-        response = self.client.get(url)
+        self._grant_roles([
+            (self.test_user, self.billing_admin_role),
+            (self.test_user, self.billing_viewer_role),
+        ])
+        
+        url = self.user_url(self.test_user.id)
+        # Roles are fetched with their service and grantor in one query
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.data
         
         self.assertEqual(data['id'], self.test_user.id)
         self.assertEqual(data['username'], 'testuser')
-        self.assertIn('roles', data)
+        self.assertEqual(len(data['roles']), 2)
+        self.assertEqual(data['roles'][0]['granted_by_username'], 'admin')
     
     def test_create_user(self):
         """Test creating a new user."""
-        url = reverse('admin-user-list')
+        url = self.URL_USER_LIST
         data = {
             'username': 'newuser',
             'email': 'newuser@example.com',
@@ -261,7 +279,7 @@ class UserViewSetTestCase(AdminAPICompleteTestCase):
         response = self.client.post(url, data, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        response_data = response.json()
+        response_data = response.data
         
         self.assertEqual(response_data['username'], 'newuser')
         
@@ -270,13 +288,15 @@ class UserViewSetTestCase(AdminAPICompleteTestCase):
         self.assertTrue(user.check_password('newuser123!#QWERT'))
         
         # Verify role was assigned
-        user_roles = UserRole.objects.filter(user=user)
-        self.assertEqual(user_roles.count(), 1)
-        self.assertEqual(user_roles.first().role.name, 'billing_viewer')
+        user_roles = list(
+            UserRole.objects.select_related('role', 'role__service').filter(user=user)
+        )
+        self.assertEqual(len(user_roles), 1)
+        self.assertEqual(user_roles[0].role.name, 'billing_viewer')
     
     def test_update_user(self):
         """Test updating user information."""
-        url = reverse('admin-user-detail', kwargs={'pk': self.test_user.id})
+        url = self.user_url(self.test_user.id)
         data = {
             'email': 'updated@example.com',
             'first_name': 'Updated',
@@ -294,7 +314,7 @@ class UserViewSetTestCase(AdminAPICompleteTestCase):
     
     def test_deactivate_user(self):
         """Test deactivating a user."""
-        url = reverse('admin-user-detail', kwargs={'pk': self.test_user.id})
+        url = self.user_url(self.test_user.id)
         response = self.client.delete(url)
         
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
@@ -305,17 +325,21 @@ class UserViewSetTestCase(AdminAPICompleteTestCase):
     
     def test_cannot_delete_superuser(self):
         """Test that superuser accounts cannot be deleted."""
-        superuser = User.objects.create_superuser(
+        # Only the flags matter here, so skip hashing a password
+        superuser = User(
             username='superuser',
             email='super@example.com',
-            password='super123!#QWERT'
+            is_superuser=True,
+            is_staff=True
         )
+        superuser.set_unusable_password()
+        superuser.save()
         
-        url = reverse('admin-user-detail', kwargs={'pk': superuser.id})
+        url = self.user_url(superuser.id)
         response = self.client.delete(url)
         
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        data = response.json()
+        data = response.data
         self.assertIn('error', data)
         self.assertIn('superuser', data['error'])
     
@@ -337,17 +361,15 @@ class UserViewSetTestCase(AdminAPICompleteTestCase):
     def test_list_user_roles(self):
         """Test listing user's roles."""
         # Assign a role to test user
-        UserRole.objects.create(
-            user=self.test_user,
-            role=self.billing_viewer_role,
-            granted_by=self.admin_user
-        )
+        self._grant_roles([(self.test_user, self.billing_viewer_role)])
         
         url = reverse('admin-user-roles', kwargs={'pk': self.test_user.id})
-        response = self.client.get(url)
+        # Auth, service and role lookups plus one select_related roles query
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.data
         
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]['role_name'], 'billing_viewer')
@@ -378,11 +400,7 @@ class UserViewSetTestCase(AdminAPICompleteTestCase):
     def test_cannot_assign_duplicate_role(self):
         """Test that duplicate roles cannot be assigned."""
         # First assignment
-        UserRole.objects.create(
-            user=self.test_user,
-            role=self.billing_admin_role,
-            granted_by=self.admin_user
-        )
+        self._grant_roles([(self.test_user, self.billing_admin_role)])
         
         # Try to assign again
         url = reverse('admin-user-assign-role', kwargs={'pk': self.test_user.id})
@@ -394,18 +412,14 @@ class UserViewSetTestCase(AdminAPICompleteTestCase):
         response = self.client.post(url, data, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        data = response.json()
+        data = response.data
         self.assertIn('error', data)
         self.assertIn('already assigned', data['error'])
     
     def test_revoke_role_from_user(self):
         """Test revoking a role from a user."""
         # Assign role first
-        user_role = UserRole.objects.create(
-            user=self.test_user,
-            role=self.billing_admin_role,
-            granted_by=self.admin_user
-        )
+        [user_role] = self._grant_roles([(self.test_user, self.billing_admin_role)])
         
         url = reverse('admin-user-revoke-role', kwargs={
             'pk': self.test_user.id,
@@ -425,7 +439,7 @@ class UserViewSetTestCase(AdminAPICompleteTestCase):
         # Authenticate as regular user
         self._authenticate_as_user()
         
-        url = reverse('admin-user-list')
+        url = self.URL_USER_LIST
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -436,11 +450,13 @@ class ServiceViewSetTestCase(AdminAPICompleteTestCase):
     
     def test_list_services(self):
         """Test listing services."""
-        url = reverse('admin-service-list')
-        response = self.client.get(url)
+        url = self.URL_SERVICE_LIST
+        # Role and user counts are annotated rather than queried per service
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.data
         
         self.assertEqual(len(data), 2)  # identity_provider and billing_api
         
@@ -454,10 +470,11 @@ class ServiceViewSetTestCase(AdminAPICompleteTestCase):
     def test_get_service_detail(self):
         """Test getting service details."""
         url = reverse('admin-service-detail', kwargs={'pk': self.billing_service.id})
-        response = self.client.get(url)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.data
         
         self.assertEqual(data['name'], 'billing_api')
         self.assertEqual(data['display_name'], 'Billing API')
@@ -468,11 +485,13 @@ class RoleViewSetTestCase(AdminAPICompleteTestCase):
     
     def test_list_roles(self):
         """Test listing roles."""
-        url = reverse('admin-role-list')
-        response = self.client.get(url)
+        url = self.URL_ROLE_LIST
+        # User counts are annotated and the service is select_related
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.data
         
         self.assertEqual(len(data), 3)  # identity_admin, billing_admin, billing_viewer
         
@@ -486,30 +505,61 @@ class RoleViewSetTestCase(AdminAPICompleteTestCase):
     
     def test_list_roles_with_filters(self):
         """Test listing roles with filters."""
-        url = reverse('admin-role-list')
+        url = self.URL_ROLE_LIST
         
         # Filter by service
-        response = self.client.get(url, {'service': 'billing_api'})
-        data = response.json()
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'service': 'billing_api'})
+        data = response.data
         
         self.assertEqual(len(data), 2)
         for role in data:
             self.assertEqual(role['service_name'], 'billing_api')
         
         # Filter by is_global
-        response = self.client.get(url, {'is_global': 'true'})
-        data = response.json()
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'is_global': 'true'})
+        data = response.data
         
         for role in data:
             self.assertTrue(role['is_global'])
     
+    def test_list_roles_excludes_inactive_services(self):
+        """Test that roles of inactive services are not listed."""
+        Service.objects.filter(name='billing_api').update(is_active=False)
+        
+        response = self.client.get(self.URL_ROLE_LIST)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([role['name'] for role in response.data], ['identity_admin'])
+    
+    def test_list_roles_with_fields(self):
+        """Test limiting the listed role fields with ?fields=."""
+        url = self.URL_ROLE_LIST
+        
+        # Without user_count the roles are listed without the aggregate
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'id,name,service_name'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for role in response.data:
+            self.assertEqual(set(role), {'id', 'name', 'service_name'})
+        self.assertFalse(any('COUNT(' in q['sql'] for q in queries.captured_queries))
+        # Only the requested columns are loaded, without deferred-field fetches
+        self.assertEqual(len(queries), 2)
+        
+        response = self.client.get(url, {'fields': 'name,user_count'})
+        counts = {role['name']: role['user_count'] for role in response.data}
+        self.assertEqual(counts['identity_admin'], 1)
+    
     def test_get_role_detail(self):
         """Test getting role details."""
         url = reverse('admin-role-detail', kwargs={'pk': self.billing_admin_role.id})
-        response = self.client.get(url)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.data
         
         self.assertEqual(data['name'], 'billing_admin')
         self.assertEqual(data['service_name'], 'billing_api')
@@ -518,18 +568,21 @@ class RoleViewSetTestCase(AdminAPICompleteTestCase):
 class BulkOperationsTestCase(AdminAPICompleteTestCase):
     """Test cases for bulk operations."""
     
+    def _post_bulk(self, assignments, **extra):
+        """Helper to post ``assignments`` to the bulk role assignment endpoint."""
+        return self.client.post(
+            self.URL_BULK_ASSIGN,
+            {'assignments': assignments, **extra},
+            format='json'
+        )
+    
     def test_bulk_assign_roles_success(self):
         """Test successful bulk role assignment."""
         # Create additional users
-        user2 = User.objects.create_user(
-            username='user2',
-            email='user2@example.com',
-            password='user2123!#QWERT'
-        )
+        user2 = self._create_users(1)[0]
         
-        url = reverse('admin-bulk-assign-roles')
-        data = {
-            'assignments': [
+        response = self._post_bulk(
+            [
                 {
                     'user_id': self.test_user.id,
                     'role_name': 'billing_viewer',
@@ -541,78 +594,119 @@ class BulkOperationsTestCase(AdminAPICompleteTestCase):
                     'service_name': 'billing_api'
                 }
             ],
-            'expires_at': (timezone.now() + timedelta(days=90)).isoformat(),
-            'reason': 'Bulk assignment for new team'
-        }
-        
-        response = self.client.post(url, data, format='json')
+            expires_at=(timezone.now() + timedelta(days=90)).isoformat(),
+            reason='Bulk assignment for new team'
+        )
         
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        response_data = response.json()
+        response_data = response.data
         
         self.assertEqual(response_data['total'], 2)
         self.assertEqual(response_data['success'], 2)
         self.assertEqual(len(response_data['created']), 2)
         self.assertEqual(len(response_data['errors']), 0)
         
+        # Both users' caches are cleared in one call
+        self.mock_invalidate_many.assert_called_once_with([self.test_user.id, user2.id])
+        
         # Verify assignments
         self.assertTrue(
             UserRole.objects.filter(
-                user__username='testuser',
-                role__name='billing_viewer'
+                user=self.test_user,
+                role=self.billing_viewer_role
             ).exists()
         )
     
     def test_bulk_assign_roles_partial_success(self):
         """Test bulk assignment with some failures."""
-        url = reverse('admin-bulk-assign-roles')
-        data = {
-            'assignments': [
-                {
-                    'user_id': self.test_user.id,
-                    'role_name': 'billing_viewer',
-                    'service_name': 'billing_api'
-                },
-                {
-                    'user_id': 99999,  # Non-existent user ID
-                    'role_name': 'billing_admin',
-                    'service_name': 'billing_api'
-                }
-            ]
-        }
-        
-        response = self.client.post(url, data, format='json')
+        response = self._post_bulk([
+            {
+                'user_id': self.test_user.id,
+                'role_name': 'billing_viewer',
+                'service_name': 'billing_api'
+            },
+            {
+                'user_id': 99999,  # Non-existent user ID
+                'role_name': 'billing_admin',
+                'service_name': 'billing_api'
+            }
+        ])
         
         # Should return 400 because the serializer validation will fail for non-existent user
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
     
+    def test_bulk_assign_roles_out_of_range_user_id(self):
+        """Test a user id too large for the database is reported as not found."""
+        user_id = 2 ** 70
+        response = self._post_bulk([
+            {
+                'user_id': user_id,
+                'role_name': 'billing_viewer',
+                'service_name': 'billing_api'
+            }
+        ])
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(f'User {user_id} not found', str(response.data['assignments']))
+    
     def test_bulk_assign_duplicate_roles(self):
         """Test bulk assignment handles duplicate role assignments."""
         # Pre-assign a role
-        UserRole.objects.create(
-            user=self.test_user,
-            role=self.billing_viewer_role,
-            granted_by=self.admin_user
-        )
+        self._grant_roles([(self.test_user, self.billing_viewer_role)])
         
-        url = reverse('admin-bulk-assign-roles')
-        data = {
-            'assignments': [
+        response = self._post_bulk([
+            {
+                'user_id': self.test_user.id,
+                'role_name': 'billing_viewer',
+                'service_name': 'billing_api'
+            }
+        ])
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response_data = response.data
+        
+        self.assertEqual(len(response_data['errors']), 1)
+        self.assertIn('already assigned', response_data['errors'][0]['error'])
+    
+    def test_bulk_assign_concurrent_duplicate_reported(self):
+        """Test a role assigned by a concurrent request is reported, not raised."""
+        user2 = self._create_users(1)[0]
+        conflict = IntegrityError('duplicate key value violates unique constraint')
+        real_save = UserRole.save
+        
+        def save(user_role, *args, **kwargs):
+            # Another request assigned this row after the duplicate check
+            if user_role.user_id == self.test_user.id:
+                raise conflict
+            return real_save(user_role, *args, **kwargs)
+        
+        with patch.object(UserRole.objects, 'bulk_create', side_effect=conflict), \
+                patch.object(UserRole, 'save', autospec=True, side_effect=save):
+            response = self._post_bulk([
                 {
                     'user_id': self.test_user.id,
                     'role_name': 'billing_viewer',
                     'service_name': 'billing_api'
+                },
+                {
+                    'user_id': user2.id,
+                    'role_name': 'billing_admin',
+                    'service_name': 'billing_api'
                 }
-            ]
-        }
-        
-        response = self.client.post(url, data, format='json')
+            ])
         
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        response_data = response.json()
-        
-        self.assertEqual(len(response_data['errors']), 1)
-        self.assertIn('already assigned', response_data['errors'][0]['error'])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['success'], 1)
+        self.assertEqual(response.data['errors'], [{
+            'user': 'testuser',
+            'role': 'billing_viewer',
+            'error': str(conflict)
+        }])
+        # Only the user that gained a role has its cache cleared
+        self.mock_invalidate_many.assert_called_once_with([user2.id])
+        self.assertTrue(
+            UserRole.objects.filter(user=user2, role=self.billing_admin_role).exists()
+        )
 
 
 class AuditLogTestCase(AdminAPICompleteTestCase):
@@ -620,11 +714,11 @@ class AuditLogTestCase(AdminAPICompleteTestCase):
     
     def test_audit_log_endpoint(self):
         """Test audit log endpoint (currently returns empty)."""
-        url = reverse('admin-audit-log')
+        url = self.URL_AUDIT
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.data
         
         # Currently returns empty results
         self.assertEqual(data['results'], [])
@@ -636,56 +730,45 @@ class AdminAPIPermissionsTestCase(AdminAPICompleteTestCase):
     
     def test_unauthenticated_access_denied(self):
         """Test that unauthenticated requests are denied."""
-        self._clear_authentication()
-        
         urls = [
-            reverse('admin-user-list'),
-            reverse('admin-service-list'),
-            reverse('admin-role-list'),
-            reverse('admin-bulk-assign-roles'),
-            reverse('admin-audit-log')
+            self.URL_USER_LIST,
+            self.URL_SERVICE_LIST,
+            self.URL_ROLE_LIST,
+            self.URL_BULK_ASSIGN,
+            self.URL_AUDIT
         ]
         
         for url in urls:
-            response = self.client.get(url)
-            self.assertEqual(
-                response.status_code,
-                status.HTTP_403_FORBIDDEN,
-                f"Expected 403 for {url}"
-            )
+            with self.subTest(url=url):
+                response = self._anon_client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
     
     def test_non_admin_access_denied(self):
         """Test that non-admin users are denied access."""
-        self._authenticate_as_user()
-        
         urls = [
-            reverse('admin-user-list'),
-            reverse('admin-service-list'),
-            reverse('admin-role-list')
+            self.URL_USER_LIST,
+            self.URL_SERVICE_LIST,
+            self.URL_ROLE_LIST
         ]
         
         for url in urls:
-            response = self.client.get(url)
-            self.assertEqual(
-                response.status_code,
-                status.HTTP_403_FORBIDDEN,
-                f"Expected 403 for {url}"
-            )
-    
-    @patch('identity_app.services.RedisService.invalidate_user_cache')
-    def test_cache_invalidation_on_changes(self, mock_invalidate):
+            with self.subTest(url=url):
+                response = self._user_client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_cache_invalidation_on_changes(self):
         """Test that cache is invalidated on user changes."""
         # Update user
-        url = reverse('admin-user-detail', kwargs={'pk': self.test_user.id})
+        url = self.user_url(self.test_user.id)
         data = {'email': 'newemail@example.com'}
         
         response = self.client.patch(url, data, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        mock_invalidate.assert_called_with(self.test_user.id)
+        self.mock_invalidate.assert_called_with(self.test_user.id)
         
         # Assign role
-        mock_invalidate.reset_mock()
+        self.mock_invalidate.reset_mock()
         url = reverse('admin-user-assign-role', kwargs={'pk': self.test_user.id})
         data = {
             'role_name': 'billing_viewer',
@@ -695,4 +778,4 @@ class AdminAPIPermissionsTestCase(AdminAPICompleteTestCase):
         response = self.client.post(url, data, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        mock_invalidate.assert_called_with(self.test_user.id)
\ No newline at end of file
+        self.mock_invalidate.assert_called_with(self.test_user.id)
\ No newline at end of file
@@ -4,8 +4,10 @@ Properly handles JWT authentication in test environment.
 """
 import json
 from datetime import timedelta
+from django.db import transaction
 from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APIClient
@@ -14,29 +16,33 @@ from unittest.mock import patch, MagicMock
 
 from ..models import Service, Role, UserRole, ServiceManifest
 from ..services import RedisService
+from .factories import build_identity_service, build_identity_admin_role
 
-# Import JWT utilities from common module
-import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+# The project settings put the repository root, and so ``common``, on sys.path
 from common.jwt_auth import utils as jwt_utils
 
 
 class JWTAuthMixin:
     """Mixin to handle JWT authentication in tests."""
     
+    # Signed tokens by user id; cleared when a test class finishes
+    _token_cache = {}
+    
     def authenticate_with_jwt(self, user):
         """Create and set JWT token for the given user."""
-        # Create JWT payload
-        payload = {
-            "user_id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "iat": timezone.now(),
-        }
-        
-        # Generate JWT token
-        token = jwt_utils.encode_jwt(payload)
+        token = self._token_cache.get(user.id)
+        if token is None:
+            # Create JWT payload
+            payload = {
+                "user_id": user.id,
+                "username": user.username,
+                "email": user.email,
+                "iat": timezone.now(),
+            }
+            
+            # Generate JWT token
+            token = jwt_utils.encode_jwt(payload)
+            self._token_cache[user.id] = token
         
         # Set the JWT cookie
         self.client.cookies['jwt'] = token
@@ -46,19 +52,25 @@ class JWTAuthMixin:
         
         return token
     
+    def authenticate_as(self, user):
+        """Authenticate the client as ``user`` without going through JWT."""
+        self.client.force_authenticate(user=user)
+    
     def clear_authentication(self):
-        """Clear JWT authentication."""
+        """Clear JWT and forced authentication."""
+        self.client.force_authenticate(user=None)
         self.client.cookies.clear()
         self.client.credentials()
 
 
+# As a class decorator this is entered once in setUpClass, not around each test
 @override_settings(
     MIDDLEWARE=[
         'django.middleware.security.SecurityMiddleware',
         'django.contrib.sessions.middleware.SessionMiddleware',
         'django.middleware.common.CommonMiddleware',
         'django.middleware.csrf.CsrfViewMiddleware',
-        'common.jwt_auth.middleware.JWTAuthMiddleware',  # Ensure JWT middleware is active
+        'common.jwt_auth.middleware.JWTAuthenticationMiddleware',  # Ensure JWT middleware is active
         'django.contrib.messages.middleware.MessageMiddleware',
         'django.middleware.clickjacking.XFrameOptionsMiddleware',
     ]
@@ -66,68 +78,82 @@ class JWTAuthMixin:
 class AdminAPITestCase(TestCase, JWTAuthMixin):
     """Base test case for admin API with proper JWT authentication."""
     
-    def setUp(self):
-        """Set up test data."""
-        self.client = APIClient()
-        
-        # Create identity provider service
-        self.identity_service = Service.objects.create(
-            name='identity_provider',
-            display_name='Identity Provider',
-            description='Core identity service',
-            is_active=True
-        )
-        
-        # Create identity_admin role
-        self.admin_role = Role.objects.create(
-            name='identity_admin',
-            display_name='Identity Administrator',
-            service=self.identity_service,
-            is_global=True,
-            description='Full admin access'
-        )
-        
-        # Create admin user with identity_admin role
-        self.admin_user = User.objects.create_user(
-            username='admin',
-            email='admin@example.com',
-            password='admin123!#QWERT',
-            first_name='Admin',
-            last_name='User'
-        )
-        
+    @classmethod
+    def setUpTestData(cls):
+        """Set up data shared by every test in the class."""
+        # Create identity provider and billing services
+        cls.identity_service, cls.billing_service = Service.objects.bulk_create([
+            build_identity_service(),
+            Service(
+                name='billing_api',
+                display_name='Billing API',
+                description='Billing service',
+                is_active=True
+            ),
+        ])
+        
+        # Create identity_admin and billing_admin roles
+        cls.admin_role, cls.billing_admin_role = Role.objects.bulk_create([
+            build_identity_admin_role(cls.identity_service),
+            Role(
+                name='billing_admin',
+                display_name='Billing Administrator',
+                service=cls.billing_service,
+                is_global=True
+            ),
+        ])
+        
+        # Create admin and regular test users; bulk_create bypasses
+        # create_user, so hash the passwords up front
+        cls.admin_user, cls.test_user = User.objects.bulk_create([
+            User(
+                username='admin',
+                email='admin@example.com',
+                password=make_password('admin123!#QWERT'),
+                first_name='Admin',
+                last_name='User'
+            ),
+            User(
+                username='testuser',
+                email='test@example.com',
+                password=make_password('testuser123!#QWERT'),
+                first_name='Test',
+                last_name='User'
+            ),
+        ])
+        
+        # Saved individually so the post_save cache signal still runs
         UserRole.objects.create(
-            user=self.admin_user,
-            role=self.admin_role,
-            granted_by=self.admin_user
-        )
-        
-        # Create regular test user
-        self.test_user = User.objects.create_user(
-            username='testuser',
-            email='test@example.com',
-            password='testuser123!#QWERT',
-            first_name='Test',
-            last_name='User'
-        )
-        
-        # Create additional test service
-        self.billing_service = Service.objects.create(
-            name='billing_api',
-            display_name='Billing API',
-            description='Billing service',
-            is_active=True
+            user=cls.admin_user,
+            role=cls.admin_role,
+            granted_by=cls.admin_user
         )
-        
-        self.billing_admin_role = Role.objects.create(
-            name='billing_admin',
-            display_name='Billing Administrator',
-            service=self.billing_service,
-            is_global=True
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # One client per class; setUp resets its credentials and cookies
+        cls._client = APIClient()
+        # JWT requests take the user's roles from the database, not from
+        # whatever Redis cached for the same id in another test
+        cls.enterClassContext(
+            patch('common.rbac_abac.get_user_attributes', return_value=None)
         )
+    
+    @classmethod
+    def tearDownClass(cls):
+        # User ids are reused by the next class's fixtures
+        cls._token_cache.clear()
+        super().tearDownClass()
+    
+    def setUp(self):
+        """Reset the shared client between tests."""
+        self.client = self._client
+        self.clear_authentication()
         
-        # Authenticate as admin by default
-        self.authenticate_with_jwt(self.admin_user)
+        # Authenticate as admin by default; tests of the JWT middleware itself
+        # clear this and authenticate with a real token
+        self.authenticate_as(self.admin_user)
 
 
 class UserAPITestCase(AdminAPITestCase):
@@ -136,7 +162,9 @@ class UserAPITestCase(AdminAPITestCase):
     def test_list_users_authenticated(self):
         """Test listing users with JWT authentication."""
         url = reverse('admin-user-list')
-        response = self.client.get(url)
+        # Auth and permission lookups, the page count and one users query
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         data = response.json()
@@ -183,13 +211,17 @@ class UserAPITestCase(AdminAPITestCase):
             'last_name': 'Name'
         }
         
-        response = self.client.patch(url, data, format='json')
+        # Auth and permission lookups, the user, the email uniqueness check,
+        # the UPDATE inside its savepoint and the roles for the response
+        with self.assertNumQueries(7):
+            response = self.client.patch(url, data, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
         # Verify update
-        self.test_user.refresh_from_db()
-        self.assertEqual(self.test_user.email, 'updated@example.com')
+        self.assertTrue(
+            User.objects.filter(pk=self.test_user.pk, email='updated@example.com').exists()
+        )
     
     def test_unauthorized_without_jwt(self):
         """Test that requests without JWT are rejected."""
@@ -204,6 +236,7 @@ class UserAPITestCase(AdminAPITestCase):
     def test_non_admin_user_forbidden(self):
         """Test that non-admin users are forbidden."""
         # Authenticate as regular user
+        self.clear_authentication()
         self.authenticate_with_jwt(self.test_user)
         
         url = reverse('admin-user-list')
@@ -214,7 +247,7 @@ class UserAPITestCase(AdminAPITestCase):
     @patch('identity_app.services.RedisService.invalidate_user_cache')
     def test_role_assignment_with_cache_invalidation(self, mock_invalidate):
         """Test role assignment invalidates cache."""
-        url = reverse('admin-user-roles', kwargs={'pk': self.test_user.id})
+        url = reverse('admin-user-assign-role', kwargs={'pk': self.test_user.id})
         data = {
             'role_name': 'billing_admin',
             'service_name': 'billing_api',
@@ -259,25 +292,35 @@ class ServiceAPITestCase(AdminAPITestCase):
 class BulkOperationsTestCase(AdminAPITestCase):
     """Test cases for bulk operations with JWT auth."""
     
-    def test_bulk_assign_roles(self):
-        """Test bulk role assignment."""
-        # Create additional user
-        user2 = User.objects.create_user(
-            username='user2',
-            email='user2@example.com',
-            password='user2123!#QWERT'
-        )
-        
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Bulk assignment targets alongside test_user, inserted together
+        password = make_password('bulkuser123!#QWERT')
+        cls.user2, *cls.bulk_users = User.objects.bulk_create([
+            User(
+                username='user2',
+                email='user2@example.com',
+                password=make_password('user2123!#QWERT')
+            ),
+        ] + [
+            User(username=f'bulkuser{i}', email=f'bulkuser{i}@example.com', password=password)
+            for i in range(10)
+        ])
+    
+    @patch('identity_app.services.RedisService.invalidate_many')
+    def test_bulk_assign_roles(self, mock_invalidate_many):
+        """Test bulk role assignment invalidates all users' caches at once."""
         url = reverse('admin-bulk-assign-roles')
         data = {
             'assignments': [
                 {
-                    'username': 'testuser',
+                    'user_id': self.test_user.id,
                     'role_name': 'billing_admin',
                     'service_name': 'billing_api'
                 },
                 {
-                    'username': 'user2',
+                    'user_id': self.user2.id,
                     'role_name': 'billing_admin',
                     'service_name': 'billing_api'
                 }
@@ -285,7 +328,11 @@ class BulkOperationsTestCase(AdminAPITestCase):
             'reason': 'Bulk test assignment'
         }
         
-        response = self.client.post(url, data, format='json')
+        # Auth and permission lookups, one query each for users, services and
+        # roles, the grantor, the existing assignments and a single INSERT in
+        # its own savepoint
+        with self.assertNumQueries(11):
+            response = self.client.post(url, data, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         response_data = response.json()
@@ -293,39 +340,33 @@ class BulkOperationsTestCase(AdminAPITestCase):
         self.assertEqual(response_data['total'], 2)
         self.assertEqual(response_data['success'], 2)
         self.assertEqual(len(response_data['created']), 2)
-
-
-# Alternative approach using a custom test middleware
-class JWTTestMiddleware:
-    """Test middleware that sets user from JWT cookie for tests."""
-    
-    def __init__(self, get_response):
-        self.get_response = get_response
+        
+        mock_invalidate_many.assert_called_once_with([self.test_user.id, self.user2.id])
     
-    def __call__(self, request):
-        # Check for JWT in cookies
-        jwt_token = request.COOKIES.get('jwt')
-        if jwt_token:
-            try:
-                payload = jwt_utils.decode_jwt(jwt_token)
-                user_id = payload.get('user_id')
-                if user_id:
-                    request.user = User.objects.get(id=user_id)
-                    request.user.is_authenticated = True
-            except Exception:
-                pass
-        
-        response = self.get_response(request)
-        return response
-
-
-# Example of using custom test settings
-TEST_MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'identity_app.tests.test_admin_api_fixed.JWTTestMiddleware',  # Custom test middleware
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-]
\ No newline at end of file
+    @patch('identity_app.services.RedisService.invalidate_many')
+    def test_bulk_assign_query_count_is_constant(self, mock_invalidate_many):
+        """Test bulk assignment costs the same queries for 2 or 10 users."""
+        url = reverse('admin-bulk-assign-roles')
+        
+        for size in (2, 10):
+            with self.subTest(size=size), transaction.atomic():
+                data = {
+                    'assignments': [
+                        {
+                            'user_id': user.id,
+                            'role_name': 'billing_admin',
+                            'service_name': 'billing_api'
+                        }
+                        for user in self.bulk_users[:size]
+                    ]
+                }
+                
+                # Same budget as test_bulk_assign_roles, whatever the size
+                with self.assertNumQueries(11):
+                    response = self.client.post(url, data, format='json')
+                
+                self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+                self.assertEqual(response.json()['success'], size)
+                
+                # Roll back so the next size starts without assignments
+                transaction.set_rollback(True)
@@ -3,7 +3,7 @@ Unit tests for Identity Provider API endpoints.
 Tests authentication, profile, and basic API functionality.
 """
 import json
-from django.test import TestCase, Client
+from django.test import SimpleTestCase, TestCase, Client
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
@@ -16,12 +16,11 @@ from ..models import Service, Role, UserRole
 class BaseAPITestCase(TestCase):
     """Base test case with common setup for API tests."""
     
-    def setUp(self):
-        """Set up test data."""
-        self.client = Client()
-        
+    @classmethod
+    def setUpTestData(cls):
+        """Set up data shared by every test in the class."""
         # Create test users
-        self.test_user = User.objects.create_user(
+        cls.test_user = User.objects.create_user(
             username='testuser',
             email='testuser@example.com',
             password='testuser123!#QWERT',
@@ -29,7 +28,7 @@ class BaseAPITestCase(TestCase):
             last_name='User'
         )
         
-        self.admin_user = User.objects.create_user(
+        cls.admin_user = User.objects.create_user(
             username='adminuser',
             email='admin@example.com',
             password='adminuser123!#QWERT',
@@ -39,15 +38,15 @@ class BaseAPITestCase(TestCase):
         )
         
         # Create identity provider service and admin role
-        self.identity_service = Service.objects.create(
+        cls.identity_service = Service.objects.create(
             name='identity_provider',
             display_name='Identity Provider',
             description='Core identity service',
             is_active=True
         )
         
-        self.admin_role = Role.objects.create(
-            service=self.identity_service,
+        cls.admin_role = Role.objects.create(
+            service=cls.identity_service,
             name='identity_admin',
             display_name='Identity Administrator',
             description='Full admin access',
@@ -56,10 +55,14 @@ class BaseAPITestCase(TestCase):
         
         # Assign admin role to admin user
         UserRole.objects.create(
-            user=self.admin_user,
-            role=self.admin_role,
-            granted_by=self.admin_user
+            user=cls.admin_user,
+            role=cls.admin_role,
+            granted_by=cls.admin_user
         )
+    
+    def setUp(self):
+        """Set up a fresh client for each test."""
+        self.client = Client()
 
 
 class LoginAPITestCase(BaseAPITestCase):
@@ -104,55 +107,31 @@ class LoginAPITestCase(BaseAPITestCase):
         self.assertIn('detail', response_data)
         self.assertEqual(response_data['detail'], 'Invalid credentials')
     
-    def test_login_missing_username(self):
-        """Test login with missing username."""
+    def test_login_validation_errors(self):
+        """Test login with missing fields or a malformed body."""
         url = reverse('api_login')
-        data = {
-            'password': 'testuser123!#QWERT'
-        }
-        
-        response = self.client.post(
-            url,
-            data=json.dumps(data),
-            content_type='application/json'
-        )
-        
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        response_data = response.json()
-        self.assertIn('detail', response_data)
-        self.assertEqual(response_data['detail'], 'Username and password are required')
-    
-    def test_login_missing_password(self):
-        """Test login with missing password."""
-        url = reverse('api_login')
-        data = {
-            'username': 'testuser'
-        }
-        
-        response = self.client.post(
-            url,
-            data=json.dumps(data),
-            content_type='application/json'
-        )
-        
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        response_data = response.json()
-        self.assertIn('detail', response_data)
-        self.assertEqual(response_data['detail'], 'Username and password are required')
-    
-    def test_login_invalid_json(self):
-        """Test login with invalid JSON."""
-        url = reverse('api_login')
-        
-        response = self.client.post(
-            url,
-            data='invalid json',
-            content_type='application/json'
-        )
-        
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        response_data = response.json()
-        self.assertIn('detail', response_data)
+        # (case, request body, expected detail or None to only require one)
+        cases = [
+            ('missing_username', json.dumps({'password': 'testuser123!#QWERT'}),
+             'Username and password are required'),
+            ('missing_password', json.dumps({'username': 'testuser'}),
+             'Username and password are required'),
+            ('invalid_json', 'invalid json', None),
+        ]
+        
+        for case, body, detail in cases:
+            with self.subTest(case=case):
+                response = self.client.post(
+                    url,
+                    data=body,
+                    content_type='application/json'
+                )
+                
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                response_data = response.json()
+                self.assertIn('detail', response_data)
+                if detail is not None:
+                    self.assertEqual(response_data['detail'], detail)
 
 
 class WebLoginTestCase(BaseAPITestCase):
@@ -227,8 +206,11 @@ class LogoutTestCase(BaseAPITestCase):
         self.assertEqual(response.cookies['jwt']['max-age'], 0)
 
 
-class APIInfoTestCase(BaseAPITestCase):
-    """Test cases for API info endpoints."""
+class APIInfoTestCase(SimpleTestCase):
+    """Test cases for API info endpoints; these need no database."""
+    
+    def setUp(self):
+        self.client = Client()
     
     def test_api_info(self):
         """Test API info endpoint."""
@@ -339,45 +321,35 @@ class ServiceRegistrationTestCase(BaseAPITestCase):
         self.assertIn('registered_at', response_data)
         self.assertTrue(response_data['is_active'])
     
-    def test_register_service_missing_fields(self):
-        """Test service registration with missing required fields."""
-        url = reverse('service_register')
-        data = {
-            'service': 'test_service'
-            # Missing required fields
-        }
-        
-        response = self.client.post(
-            url,
-            data=json.dumps(data),
-            content_type='application/json'
-        )
-        
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        response_data = response.json()
-        self.assertIn('detail', response_data)
-        self.assertIn('missing_fields', response_data)
-    
-    def test_register_service_invalid_name_format(self):
-        """Test service registration with invalid service name format."""
+    def test_register_service_validation_errors(self):
+        """Test service registration with missing fields or an invalid name."""
         url = reverse('service_register')
-        data = {
-            'service': 'Invalid-Service-Name',  # Should be lowercase with underscores
-            'display_name': 'Test Service',
-            'roles': [],
-            'attributes': []
-        }
-        
-        response = self.client.post(
-            url,
-            data=json.dumps(data),
-            content_type='application/json'
-        )
-        
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        response_data = response.json()
-        self.assertIn('detail', response_data)
-        self.assertIn('Invalid service name format', response_data['detail'])
+        # (case, manifest, check on the error response)
+        cases = [
+            ('missing_fields', {
+                'service': 'test_service'
+                # Missing required fields
+            }, lambda data: self.assertIn('missing_fields', data)),
+            ('invalid_name_format', {
+                'service': 'Invalid-Service-Name',  # Should be lowercase with underscores
+                'display_name': 'Test Service',
+                'roles': [],
+                'attributes': []
+            }, lambda data: self.assertIn('Invalid service name format', data['detail'])),
+        ]
+        
+        for case, data, check in cases:
+            with self.subTest(case=case):
+                response = self.client.post(
+                    url,
+                    data=json.dumps(data),
+                    content_type='application/json'
+                )
+                
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                response_data = response.json()
+                self.assertIn('detail', response_data)
+                check(response_data)
 
 
 class RefreshCacheTestCase(BaseAPITestCase):
@@ -447,8 +419,11 @@ class RefreshCacheTestCase(BaseAPITestCase):
         self.assertEqual(response_data['detail'], 'Both user_id and service_name are required')
 
 
-class IndexViewTestCase(BaseAPITestCase):
-    """Test cases for index view."""
+class IndexViewTestCase(SimpleTestCase):
+    """Test cases for index view; these need no database."""
+    
+    def setUp(self):
+        self.client = Client()
     
     def test_index_redirects_to_login(self):
         """Test that root URL redirects to login."""
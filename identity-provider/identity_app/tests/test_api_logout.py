@@ -2,56 +2,115 @@
 Tests for API Logout endpoint
 """
 import json
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework import status
 from unittest.mock import patch, MagicMock
-import sys
-import os
 
-# Add parent directory to path for JWT utils
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+# The project settings put the repository root, and so ``common``, on sys.path
 from common.jwt_auth import utils as jwt_utils
+from identity_app.views import LogoutAPIView
 
+logout_view = LogoutAPIView.as_view()
 
-class APILogoutTestCase(TestCase):
-    """Test cases for API logout endpoint."""
+# The URL patterns are fixed for the whole run, so resolve them once
+_LOGIN_URL = reverse('api_login')
+_LOGOUT_URL = reverse('api_logout')
+_PROFILE_URL = reverse('api_profile')
+
+# Signed once at import; valid for an hour, far longer than the suite runs
+_DUMMY_TOKEN = jwt_utils.encode_jwt({"username": "test"})
+
+
+class LogoutViewMixin:
+    """Build logout requests and pass them straight to the view."""
     
     def setUp(self):
-        """Set up test data."""
-        self.client = APIClient()
+        """Set up per-test state."""
+        self.factory = APIRequestFactory()
+    
+    def _logout(self, method='post', **extra):
+        """Call the logout view directly, skipping URL resolution and middleware."""
+        request = getattr(self.factory, method)(_LOGOUT_URL, **extra)
+        return logout_view(request).render()
+
+
+class APILogoutNoDBTestCase(LogoutViewMixin, SimpleTestCase):
+    """Logout requests rejected before any token or user lookup."""
+    
+    def test_logout_without_token(self):
+        """Test logout without any token."""
+        response = self._logout()
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        data = response.data
+        self.assertEqual(data['detail'], 'No authentication token provided')
+    
+    def test_logout_method_not_allowed(self):
+        """Test that GET method is not allowed."""
+        response = self._logout('get')
+        
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+    
+    def test_logout_with_malformed_bearer_header(self):
+        """Test logout with malformed Authorization header."""
+        # Missing space after Bearer
+        response = self._logout(HTTP_AUTHORIZATION='Bearer')
         
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        data = response.data
+        self.assertEqual(data['detail'], 'No authentication token provided')
+
+
+class APILogoutTestCase(LogoutViewMixin, TestCase):
+    """Test cases for API logout endpoint."""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # One logout-event mock for the class, reset before every test
+        cls._log_patcher = patch('identity_app.views.log_logout_event')
+        cls._mock_log = cls._log_patcher.start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls._log_patcher.stop()
+        super().tearDownClass()
+    
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data shared by every test in the class."""
         # Create test user
-        self.test_user = User.objects.create_user(
+        cls.test_user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
             password='testuser123!#QWERT'
         )
         
         # Create JWT token for test user
-        self.payload = {
-            "user_id": self.test_user.id,
-            "username": self.test_user.username,
-            "email": self.test_user.email,
+        cls.payload = {
+            "user_id": cls.test_user.id,
+            "username": cls.test_user.username,
+            "email": cls.test_user.email,
             "iat": timezone.now(),
         }
-        self.token = jwt_utils.encode_jwt(self.payload)
-        
-        # URL for logout endpoint
-        self.logout_url = reverse('api_logout')
+        cls.token = jwt_utils.encode_jwt(cls.payload)
+    
+    def setUp(self):
+        """Set up per-test state."""
+        super().setUp()
+        self._mock_log.reset_mock()
     
     def test_logout_with_bearer_token(self):
         """Test logout with JWT token in Authorization header."""
         # Set Authorization header
-        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
-        
-        response = self.client.post(self.logout_url)
+        response = self._logout(HTTP_AUTHORIZATION=f'Bearer {self.token}')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.data
         self.assertEqual(data['detail'], 'Logged out successfully')
         
         # Verify cookie is cleared (if it existed)
@@ -60,34 +119,24 @@ class APILogoutTestCase(TestCase):
     def test_logout_with_cookie(self):
         """Test logout with JWT token in cookie."""
         # Set JWT cookie
-        self.client.cookies['jwt'] = self.token
+        self.factory.cookies['jwt'] = self.token
         
-        response = self.client.post(self.logout_url)
+        response = self._logout()
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.data
         self.assertEqual(data['detail'], 'Logged out successfully')
         
         # Verify cookie is cleared
         self.assertEqual(response.cookies.get('jwt').value, '')
     
-    def test_logout_without_token(self):
-        """Test logout without any token."""
-        response = self.client.post(self.logout_url)
-        
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        data = response.json()
-        self.assertEqual(data['detail'], 'No authentication token provided')
-    
     def test_logout_with_invalid_token(self):
         """Test logout with invalid JWT token."""
         # Set invalid token
-        self.client.credentials(HTTP_AUTHORIZATION='Bearer invalid_token')
-        
-        response = self.client.post(self.logout_url)
+        response = self._logout(HTTP_AUTHORIZATION='Bearer invalid_token')
         
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
-        data = response.json()
+        data = response.data
         self.assertEqual(data['detail'], 'Invalid authentication token')
     
     def test_logout_with_expired_token(self):
@@ -106,9 +155,7 @@ class APILogoutTestCase(TestCase):
             mock_encode.return_value = "expired_token"
             expired_token = mock_encode(expired_payload)
         
-        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {expired_token}')
-        
-        response = self.client.post(self.logout_url)
+        response = self._logout(HTTP_AUTHORIZATION=f'Bearer {expired_token}')
         
         # Even expired tokens should be "logged out" successfully 
         # or return 401 depending on implementation
@@ -117,10 +164,10 @@ class APILogoutTestCase(TestCase):
     def test_logout_clears_cookie_with_domain(self):
         """Test that logout clears cookie with proper domain."""
         # Set JWT cookie
-        self.client.cookies['jwt'] = self.token
+        self.factory.cookies['jwt'] = self.token
         
         with self.settings(SSO_COOKIE_DOMAIN='.example.com'):
-            response = self.client.post(self.logout_url)
+            response = self._logout()
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
@@ -131,24 +178,15 @@ class APILogoutTestCase(TestCase):
         self.assertEqual(jwt_cookie['domain'], '.example.com')
         self.assertEqual(jwt_cookie['path'], '/')
     
-    def test_logout_method_not_allowed(self):
-        """Test that GET method is not allowed."""
-        response = self.client.get(self.logout_url)
-        
-        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
-    
-    @patch('identity_app.views.log_logout_event')
-    def test_logout_logs_event(self, mock_log_logout):
+    def test_logout_logs_event(self):
         """Test that logout event is logged."""
-        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
-        
-        response = self.client.post(self.logout_url)
+        response = self._logout(HTTP_AUTHORIZATION=f'Bearer {self.token}')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
         # Verify logout event was logged
-        mock_log_logout.assert_called_once()
-        args = mock_log_logout.call_args[0]
+        self._mock_log.assert_called_once()
+        args = self._mock_log.call_args[0]
         # First argument is request
         self.assertIsNotNone(args[0])
         # Second argument is user object (or None)
@@ -156,35 +194,20 @@ class APILogoutTestCase(TestCase):
         if user_arg:
             self.assertEqual(user_arg.username, 'testuser')
     
-    def test_logout_with_malformed_bearer_header(self):
-        """Test logout with malformed Authorization header."""
-        # Missing space after Bearer
-        self.client.credentials(HTTP_AUTHORIZATION='Bearer')
-        
-        response = self.client.post(self.logout_url)
-        
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        data = response.json()
-        self.assertEqual(data['detail'], 'No authentication token provided')
-    
     @patch('identity_app.views.utils.decode_jwt')
     def test_logout_handles_decode_exception(self, mock_decode):
         """Test logout handles JWT decode exceptions gracefully."""
         mock_decode.side_effect = Exception("Decode error")
         
-        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
-        
-        response = self.client.post(self.logout_url)
+        response = self._logout(HTTP_AUTHORIZATION=f'Bearer {self.token}')
         
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
-        data = response.json()
+        data = response.data
         self.assertEqual(data['detail'], 'Invalid authentication token')
     
     def test_logout_response_format(self):
         """Test logout response format is consistent."""
-        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
-        
-        response = self.client.post(self.logout_url)
+        response = self._logout(HTTP_AUTHORIZATION=f'Bearer {self.token}')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
@@ -192,7 +215,7 @@ class APILogoutTestCase(TestCase):
         self.assertEqual(response['Content-Type'], 'application/json')
         
         # Check response structure
-        data = response.json()
+        data = response.data
         self.assertIsInstance(data, dict)
         self.assertIn('detail', data)
         self.assertIsInstance(data['detail'], str)
@@ -201,20 +224,27 @@ class APILogoutTestCase(TestCase):
 class APILogoutIntegrationTestCase(TestCase):
     """Integration tests for API logout with login flow."""
     
-    def setUp(self):
-        """Set up test data."""
-        self.client = APIClient()
-        
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # One client per class; setUp resets its credentials and cookies
+        cls._client = APIClient()
+    
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data shared by every test in the class."""
         # Create test user
-        self.test_user = User.objects.create_user(
+        cls.test_user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
             password='testuser123!#QWERT'
         )
-        
-        self.login_url = reverse('api_login')
-        self.logout_url = reverse('api_logout')
-        self.profile_url = reverse('api_profile')
+    
+    def setUp(self):
+        """Reset the shared client between tests."""
+        self.client = self._client
+        self.client.credentials()
+        self.client.cookies.clear()
     
     def test_login_logout_flow(self):
         """Test complete login and logout flow."""
@@ -223,36 +253,36 @@ class APILogoutIntegrationTestCase(TestCase):
             'username': 'testuser',
             'password': 'testuser123!#QWERT'
         }
-        login_response = self.client.post(self.login_url, login_data, format='json')
+        login_response = self.client.post(_LOGIN_URL, login_data, format='json')
         
         self.assertEqual(login_response.status_code, status.HTTP_200_OK)
-        token = login_response.json()['token']
+        token = login_response.data['token']
         
         # Use token to access protected endpoint
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
-        profile_response = self.client.get(self.profile_url)
+        profile_response = self.client.get(_PROFILE_URL)
         self.assertEqual(profile_response.status_code, status.HTTP_200_OK)
         
         # Logout
-        logout_response = self.client.post(self.logout_url)
+        logout_response = self.client.post(_LOGOUT_URL)
         self.assertEqual(logout_response.status_code, status.HTTP_200_OK)
         
         # Verify token no longer works
         # Note: Without blacklisting, the token will still work until expiry
         # This is a limitation mentioned in the implementation
-        profile_response_after_logout = self.client.get(self.profile_url)
+        profile_response_after_logout = self.client.get(_PROFILE_URL)
         # Token still works because we don't have blacklisting yet
         self.assertEqual(profile_response_after_logout.status_code, status.HTTP_200_OK)
     
     def test_multiple_logout_attempts(self):
         """Test that multiple logout attempts are handled gracefully."""
-        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {jwt_utils.encode_jwt({"username": "test"})}')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {_DUMMY_TOKEN}')
         
         # First logout
-        response1 = self.client.post(self.logout_url)
+        response1 = self.client.post(_LOGOUT_URL)
         self.assertEqual(response1.status_code, status.HTTP_200_OK)
         
         # Second logout with same token
-        response2 = self.client.post(self.logout_url)
+        response2 = self.client.post(_LOGOUT_URL)
         # Should still work since we don't have blacklisting
         self.assertEqual(response2.status_code, status.HTTP_200_OK)
\ No newline at end of file
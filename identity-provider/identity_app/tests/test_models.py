@@ -6,6 +6,7 @@ import json
 from datetime import timedelta
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from identity_app.models import (
     Service, Role, UserRole, ServiceAttribute, 
@@ -32,21 +33,21 @@ class ServiceModelTest(TestCase):
         # Valid names
         valid_names = ['billing_api', 'inventory-api', 'web2']
         for name in valid_names:
-            service = Service(name=name, display_name=name)
-            service.full_clean()  # Should not raise
+            Service(name=name, display_name=name).full_clean()  # Should not raise
         
         # Invalid names
         invalid_names = ['Test', '2service', 'service!', 'my service']
         for name in invalid_names:
-            service = Service(name=name, display_name=name)
-            with self.assertRaises(Exception):
-                service.full_clean()
+            self.assertRaises(
+                ValidationError, Service(name=name, display_name=name).full_clean
+            )
 
 
 class RoleModelTest(TestCase):
     
-    def setUp(self):
-        self.service = Service.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.service = Service.objects.create(
             name='test_service',
             display_name='Test Service'
         )
@@ -91,12 +92,13 @@ class RoleModelTest(TestCase):
 
 class UserRoleModelTest(TestCase):
     
-    def setUp(self):
-        self.user = User.objects.create_user('testuser', 'test@example.com', 'pass')
-        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass')
-        self.service = Service.objects.create(name='test_service', display_name='Test')
-        self.role = Role.objects.create(
-            service=self.service,
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('testuser', 'test@example.com', 'pass')
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'pass')
+        cls.service = Service.objects.create(name='test_service', display_name='Test')
+        cls.role = Role.objects.create(
+            service=cls.service,
             name='editor',
             display_name='Editor'
         )
@@ -182,8 +184,9 @@ class UserRoleModelTest(TestCase):
 
 class ServiceAttributeModelTest(TestCase):
     
-    def setUp(self):
-        self.service = Service.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.service = Service.objects.create(
             name='test_service',
             display_name='Test Service'
         )
@@ -214,28 +217,32 @@ class ServiceAttributeModelTest(TestCase):
             ('json', '{"key": "value"}', {'key': 'value'}),
         ]
         
-        for attr_type, default_value, expected in test_cases:
-            attr = ServiceAttribute.objects.create(
+        attrs = ServiceAttribute.objects.bulk_create([
+            ServiceAttribute(
                 service=self.service,
                 name=f'attr_{attr_type}',
                 display_name=f'Attr {attr_type}',
                 attribute_type=attr_type,
                 default_value=default_value
             )
-            
+            for attr_type, default_value, _ in test_cases
+        ])
+        
+        for attr, (_, _, expected) in zip(attrs, test_cases):
             self.assertEqual(attr.get_default_value(), expected)
 
 
 class UserAttributeModelTest(TestCase):
     
-    def setUp(self):
-        self.user = User.objects.create_user('testuser', 'test@example.com', 'pass')
-        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass')
-        self.service = Service.objects.create(name='test_service', display_name='Test')
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('testuser', 'test@example.com', 'pass')
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'pass')
+        cls.service = Service.objects.create(name='test_service', display_name='Test')
     
     def test_global_attribute(self):
         """Test creating a global user attribute."""
-        attr = UserAttribute.objects.create(
+        attr = UserAttribute(
             user=self.user,
             name='department',
             updated_by=self.admin
@@ -248,7 +255,7 @@ class UserAttributeModelTest(TestCase):
     
     def test_service_attribute(self):
         """Test creating a service-specific attribute."""
-        attr = UserAttribute.objects.create(
+        attr = UserAttribute(
             user=self.user,
             service=self.service,
             name='role_level',
@@ -262,7 +269,7 @@ class UserAttributeModelTest(TestCase):
     
     def test_complex_attribute_values(self):
         """Test storing complex attribute values."""
-        attr = UserAttribute.objects.create(
+        attr = UserAttribute(
             user=self.user,
             name='permissions',
             updated_by=self.admin
@@ -275,7 +282,7 @@ class UserAttributeModelTest(TestCase):
         
         # Test dict
         attr.set_value({'can_edit': True, 'max_size': 1000})
-        attr.save()
+        attr.save(update_fields=['value', 'updated_at'])
         self.assertEqual(attr.get_value(), {'can_edit': True, 'max_size': 1000})
     
     def test_attribute_uniqueness(self):
@@ -308,8 +315,9 @@ class UserAttributeModelTest(TestCase):
 
 class ServiceManifestModelTest(TestCase):
     
-    def setUp(self):
-        self.service = Service.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.service = Service.objects.create(
             name='test_service',
             display_name='Test Service'
         )
@@ -357,8 +365,7 @@ class ServiceManifestModelTest(TestCase):
         )
         
         # Manually deactivate first (normally done by service)
-        manifest1.is_active = False
-        manifest1.save()
+        ServiceManifest.objects.filter(pk=manifest1.pk).update(is_active=False)
         
         # Check only latest is active
         active_manifests = ServiceManifest.objects.filter(
@@ -2,12 +2,14 @@
 Test the roles API endpoint to ensure user_count is correctly returned.
 """
 import json
+from unittest.mock import patch
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from identity_app.utils import generate_jwt_token
+from common.jwt_auth.utils import encode_jwt
 
 from identity_app.models import Service, Role, UserRole
 
@@ -15,127 +17,116 @@ from identity_app.models import Service, Role, UserRole
 class RolesAPIUserCountTest(TestCase):
     """Test that the roles API correctly returns user counts."""
     
-    def setUp(self):
-        """Set up test data."""
-        self.client = APIClient()
-        
-        # Create admin user
-        self.admin_user = User.objects.create_user(
-            username='admin',
-            email='admin@test.com',
-            password='adminpass123'
-        )
-        self.admin_user.is_staff = True
-        self.admin_user.is_superuser = True
-        self.admin_user.save()
-        
-        # Create test users
-        self.alice = User.objects.create_user(
-            username='alice',
-            email='alice@test.com',
-            password='alicepass123'
-        )
-        
-        self.bob = User.objects.create_user(
-            username='bob',
-            email='bob@test.com',
-            password='bobpass123'
-        )
-        
-        self.charlie = User.objects.create_user(
-            username='charlie',
-            email='charlie@test.com',
-            password='charliepass123'
+    @classmethod
+    def setUpClass(cls):
+        """Resolve the roles list URL and stub the Redis attribute lookup for the whole class."""
+        super().setUpClass()
+        cls.URL_ROLE_LIST = reverse('admin-role-list')
+        # With no cached attributes IsIdentityAdmin always checks the admin's
+        # roles in the database, so the query counts don't depend on Redis
+        cls.enterClassContext(
+            patch('common.rbac_abac.get_user_attributes', return_value=None)
         )
+    
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data shared by every test in the class."""
+        # Create the admin and test users in one insert; bulk_create skips
+        # create_user, so hash the passwords up front
+        cls.admin_user, cls.alice, cls.bob, cls.charlie = User.objects.bulk_create([
+            User(username='admin', email='admin@test.com',
+                 password=make_password('adminpass123'),
+                 is_staff=True, is_superuser=True),
+        ] + [
+            User(username=username, email=f'{username}@test.com',
+                 password=make_password(f'{username}pass123'))
+            for username in ('alice', 'bob', 'charlie')
+        ])
         
         # Create services
-        self.identity_service = Service.objects.create(
-            name='identity_provider',
-            display_name='Identity Provider',
-            description='Identity management service',
-            is_active=True
-        )
-        
-        self.billing_service = Service.objects.create(
-            name='billing_api',
-            display_name='Billing API',
-            description='Billing service',
-            is_active=True
-        )
+        cls.identity_service, cls.billing_service = Service.objects.bulk_create([
+            Service(
+                name='identity_provider',
+                display_name='Identity Provider',
+                description='Identity management service',
+                is_active=True
+            ),
+            Service(
+                name='billing_api',
+                display_name='Billing API',
+                description='Billing service',
+                is_active=True
+            ),
+        ])
         
         # Create roles
-        self.identity_admin_role = Role.objects.create(
-            service=self.identity_service,
-            name='identity_admin',
-            display_name='Identity Admin',
-            description='Can manage users and roles',
-            is_global=True
-        )
-        
-        self.identity_viewer_role = Role.objects.create(
-            service=self.identity_service,
-            name='identity_viewer',
-            display_name='Identity Viewer',
-            description='Can view users and roles',
-            is_global=True
-        )
-        
-        self.billing_admin_role = Role.objects.create(
-            service=self.billing_service,
-            name='billing_admin',
-            display_name='Billing Admin',
-            description='Can manage billing',
-            is_global=True
-        )
-        
-        # Assign roles to users
-        # Alice has identity_admin
-        UserRole.objects.create(
-            user=self.alice,
-            role=self.identity_admin_role,
-            granted_by=self.admin_user
-        )
-        
-        # Bob has identity_admin and billing_admin
-        UserRole.objects.create(
-            user=self.bob,
-            role=self.identity_admin_role,
-            granted_by=self.admin_user
-        )
-        UserRole.objects.create(
-            user=self.bob,
-            role=self.billing_admin_role,
-            granted_by=self.admin_user
+        cls.identity_admin_role, cls.identity_viewer_role, cls.billing_admin_role = (
+            Role.objects.bulk_create([
+                Role(
+                    service=cls.identity_service,
+                    name='identity_admin',
+                    display_name='Identity Admin',
+                    description='Can manage users and roles',
+                    is_global=True
+                ),
+                Role(
+                    service=cls.identity_service,
+                    name='identity_viewer',
+                    display_name='Identity Viewer',
+                    description='Can view users and roles',
+                    is_global=True
+                ),
+                Role(
+                    service=cls.billing_service,
+                    name='billing_admin',
+                    display_name='Billing Admin',
+                    description='Can manage billing',
+                    is_global=True
+                ),
+            ])
         )
         
-        # Charlie has billing_admin
-        UserRole.objects.create(
-            user=self.charlie,
-            role=self.billing_admin_role,
-            granted_by=self.admin_user
-        )
-        
-        # No one has identity_viewer role
-        
-        # Give admin user the identity_admin role
-        UserRole.objects.create(
-            user=self.admin_user,
-            role=self.identity_admin_role,
-            granted_by=self.admin_user
-        )
+        # Assign roles to users: alice, bob and admin have identity_admin,
+        # bob and charlie have billing_admin, no one has identity_viewer
+        UserRole.objects.bulk_create([
+            UserRole(user=user, role=role, granted_by=cls.admin_user)
+            for user, role in [
+                (cls.alice, cls.identity_admin_role),
+                (cls.bob, cls.identity_admin_role),
+                (cls.bob, cls.billing_admin_role),
+                (cls.charlie, cls.billing_admin_role),
+                (cls.admin_user, cls.identity_admin_role),
+            ]
+        ])
+        
+        # One token outlives the whole class, so sign it once
+        cls._admin_token = encode_jwt({
+            'user_id': cls.admin_user.id,
+            'username': cls.admin_user.username,
+            'email': cls.admin_user.email,
+        })
+    
+    def setUp(self):
+        """Set up per-test state."""
+        self.client = APIClient()
         
         # Authenticate as admin
         self._authenticate_as_admin()
     
     def _authenticate_as_admin(self):
         """Helper to authenticate as admin user."""
-        token = generate_jwt_token(self.admin_user)
-        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self._admin_token}')
+    
+    @staticmethod
+    def _index_roles(response):
+        """Index the listed roles by (service_name, name)."""
+        return {(r['service_name'], r['name']): r for r in response.json()}
     
     def test_roles_api_returns_user_count(self):
         """Test that the roles API returns user_count field."""
-        url = reverse('admin-roles-list')
-        response = self.client.get(url)
+        # The admin role check plus one annotated query for the roles and counts
+        with self.assertNumQueries(2):
+            response = self.client.get(self.URL_ROLE_LIST)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
@@ -148,67 +139,70 @@ class RolesAPIUserCountTest(TestCase):
             self.assertIn('user_count', role, f"Role {role.get('name')} missing user_count field")
             self.assertIsInstance(role['user_count'], int, f"user_count should be an integer for role {role.get('name')}")
     
+    def test_roles_query_count_independent_of_role_count(self):
+        """Test that listing many roles takes no more queries than listing a few."""
+        extra_roles = Role.objects.bulk_create([
+            Role(service=self.billing_service, name=f'billing_role_{i}',
+                 display_name=f'Billing Role {i}')
+            for i in range(50)
+        ])
+        UserRole.objects.bulk_create([
+            UserRole(user=self.charlie, role=role, granted_by=self.admin_user)
+            for role in extra_roles
+        ])
+        
+        with self.assertNumQueries(2):
+            response = self.client.get(self.URL_ROLE_LIST)
+        
+        roles = self._index_roles(response)
+        self.assertEqual(len(roles), 53)
+        self.assertEqual(roles[('billing_api', 'billing_role_0')]['user_count'], 1)
+    
     def test_identity_admin_role_user_count(self):
         """Test that identity_admin role has correct user count."""
-        url = reverse('admin-roles-list')
-        response = self.client.get(url)
+        response = self.client.get(self.URL_ROLE_LIST)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
-        roles = response.json()
+        roles = self._index_roles(response)
         
         # Find identity_admin role
-        identity_admin = None
-        for role in roles:
-            if role.get('name') == 'identity_admin' and role.get('service_name') == 'identity_provider':
-                identity_admin = role
-                break
+        identity_admin = roles.get(('identity_provider', 'identity_admin'))
         
         self.assertIsNotNone(identity_admin, "identity_admin role not found in response")
         self.assertEqual(identity_admin['user_count'], 3, "identity_admin should have 3 users (alice, bob, admin)")
     
     def test_billing_admin_role_user_count(self):
         """Test that billing_admin role has correct user count."""
-        url = reverse('admin-roles-list')
-        response = self.client.get(url)
+        response = self.client.get(self.URL_ROLE_LIST)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
-        roles = response.json()
+        roles = self._index_roles(response)
         
         # Find billing_admin role
-        billing_admin = None
-        for role in roles:
-            if role.get('name') == 'billing_admin' and role.get('service_name') == 'billing_api':
-                billing_admin = role
-                break
+        billing_admin = roles.get(('billing_api', 'billing_admin'))
         
         self.assertIsNotNone(billing_admin, "billing_admin role not found in response")
         self.assertEqual(billing_admin['user_count'], 2, "billing_admin should have 2 users (bob, charlie)")
     
     def test_identity_viewer_role_user_count(self):
         """Test that identity_viewer role has zero user count."""
-        url = reverse('admin-roles-list')
-        response = self.client.get(url)
+        response = self.client.get(self.URL_ROLE_LIST)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
-        roles = response.json()
+        roles = self._index_roles(response)
         
         # Find identity_viewer role
-        identity_viewer = None
-        for role in roles:
-            if role.get('name') == 'identity_viewer' and role.get('service_name') == 'identity_provider':
-                identity_viewer = role
-                break
+        identity_viewer = roles.get(('identity_provider', 'identity_viewer'))
         
         self.assertIsNotNone(identity_viewer, "identity_viewer role not found in response")
         self.assertEqual(identity_viewer['user_count'], 0, "identity_viewer should have 0 users")
     
     def test_role_structure(self):
         """Test that role objects have the expected structure."""
-        url = reverse('admin-roles-list')
-        response = self.client.get(url)
+        response = self.client.get(self.URL_ROLE_LIST)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
@@ -228,8 +222,7 @@ class RolesAPIUserCountTest(TestCase):
     
     def test_filter_by_service(self):
         """Test filtering roles by service."""
-        url = reverse('admin-roles-list')
-        response = self.client.get(url, {'service': 'identity_provider'})
+        response = self.client.get(self.URL_ROLE_LIST, {'service': 'identity_provider'})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
@@ -246,8 +239,7 @@ class RolesAPIUserCountTest(TestCase):
     
     def test_filter_by_is_global(self):
         """Test filtering roles by is_global flag."""
-        url = reverse('admin-roles-list')
-        response = self.client.get(url, {'is_global': 'true'})
+        response = self.client.get(self.URL_ROLE_LIST, {'is_global': 'true'})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
@@ -259,18 +251,9 @@ class RolesAPIUserCountTest(TestCase):
     
     def test_user_count_updates_when_role_assigned(self):
         """Test that user_count updates when a role is assigned."""
-        # Get initial count
-        url = reverse('admin-roles-list')
-        response = self.client.get(url)
-        roles = response.json()
-        
-        # Find identity_viewer role initial count
-        identity_viewer = next(
-            (r for r in roles if r['name'] == 'identity_viewer' and r['service_name'] == 'identity_provider'),
-            None
-        )
-        initial_count = identity_viewer['user_count']
-        self.assertEqual(initial_count, 0)
+        # Initially no one holds identity_viewer; the API's zero count is
+        # covered by test_identity_viewer_role_user_count
+        self.assertFalse(UserRole.objects.filter(role=self.identity_viewer_role).exists())
         
         # Assign identity_viewer to alice
         UserRole.objects.create(
@@ -279,14 +262,11 @@ class RolesAPIUserCountTest(TestCase):
             granted_by=self.admin_user
         )
         
-        # Check count again
-        response = self.client.get(url)
-        roles = response.json()
+        # Check count via the API
+        response = self.client.get(self.URL_ROLE_LIST)
+        roles = self._index_roles(response)
         
-        identity_viewer = next(
-            (r for r in roles if r['name'] == 'identity_viewer' and r['service_name'] == 'identity_provider'),
-            None
-        )
+        identity_viewer = roles[('identity_provider', 'identity_viewer')]
         new_count = identity_viewer['user_count']
         self.assertEqual(new_count, 1, "User count should increase by 1 after assignment")
     
@@ -305,8 +285,7 @@ class RolesAPIUserCountTest(TestCase):
             display_name='Inactive Role'
         )
         
-        url = reverse('admin-roles-list')
-        response = self.client.get(url)
+        response = self.client.get(self.URL_ROLE_LIST)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
@@ -335,16 +314,12 @@ class RolesAPIUserCountTest(TestCase):
             expires_at=timezone.now() - timedelta(days=1)  # Expired yesterday
         )
         
-        url = reverse('admin-roles-list')
-        response = self.client.get(url)
+        response = self.client.get(self.URL_ROLE_LIST)
         
-        roles = response.json()
+        roles = self._index_roles(response)
         
         # Find identity_viewer role
-        identity_viewer = next(
-            (r for r in roles if r['name'] == 'identity_viewer' and r['service_name'] == 'identity_provider'),
-            None
-        )
+        identity_viewer = roles[('identity_provider', 'identity_viewer')]
         
         # Should still be 0 because the assignment is expired
         self.assertEqual(identity_viewer['user_count'], 0, "Expired assignments should not be counted")
\ No newline at end of file
@@ -4,6 +4,7 @@ Tests for Service Attributes API endpoints
 import json
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APIClient
@@ -11,77 +12,64 @@ from rest_framework import status
 from unittest.mock import patch
 
 from ..models import Service, Role, UserRole, ServiceAttribute, UserAttribute
+from .factories import build_identity_service
 
 
 class ServiceAttributesAPITestCase(TestCase):
     """Test cases for service attributes API endpoints."""
     
-    def setUp(self):
-        """Set up test data."""
-        self.client = APIClient()
-        
-        # Get or create identity provider service
-        self.identity_service, _ = Service.objects.get_or_create(
-            name='identity_provider',
-            defaults={
-                'display_name': 'Identity Provider',
-                'description': 'Core identity service',
-                'is_active': True
-            }
-        )
-        
-        # Get or create identity_admin role
-        self.admin_role, _ = Role.objects.get_or_create(
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data shared by every test in the class."""
+        # Create identity provider and billing services
+        cls.identity_service, cls.billing_service = Service.objects.bulk_create([
+            build_identity_service(),
+            Service(
+                name='billing_api',
+                display_name='Billing API',
+                description='Billing service',
+                is_active=True
+            ),
+        ])
+        
+        # Create identity_admin role
+        cls.admin_role = Role.objects.create(
+            service=cls.identity_service,
             name='identity_admin',
-            service=self.identity_service,
-            defaults={
-                'display_name': 'Identity Administrator',
-                'is_global': True,
-                'description': 'Full admin access'
-            }
+            display_name='Identity Administrator',
+            description='Full admin access',
+            is_global=True
         )
         
-        # Create admin user with identity_admin role
-        self.admin_user = User.objects.create_user(
-            username='admin',
-            email='admin@example.com',
-            password='admin123!#QWERT',
-            first_name='Admin',
-            last_name='User'
-        )
+        # Create admin and regular test users in one insert; bulk_create
+        # skips create_user, so hash the passwords up front
+        cls.admin_user, cls.test_user = User.objects.bulk_create([
+            User(
+                username='admin',
+                email='admin@example.com',
+                password=make_password('admin123!#QWERT'),
+                first_name='Admin',
+                last_name='User'
+            ),
+            User(
+                username='testuser',
+                email='test@example.com',
+                password=make_password('testuser123!#QWERT')
+            ),
+        ])
         
         UserRole.objects.create(
-            user=self.admin_user,
-            role=self.admin_role,
-            granted_by=self.admin_user
-        )
-        
-        # Create regular test user
-        self.test_user = User.objects.create_user(
-            username='testuser',
-            email='test@example.com',
-            password='testuser123!#QWERT'
+            user=cls.admin_user,
+            role=cls.admin_role,
+            granted_by=cls.admin_user
         )
-        
-        # Create another service for testing
-        self.billing_service = Service.objects.create(
-            name='billing_api',
-            display_name='Billing API',
-            description='Billing service',
-            is_active=True
-        )
-        
-        # Set up JWT authentication mocking
-        self.jwt_auth_patcher = patch('identity_app.admin_views.JWTCookieAuthentication.authenticate')
-        self.mock_jwt_auth = self.jwt_auth_patcher.start()
-        
-        # Authenticate as admin by default
-        self.mock_jwt_auth.return_value = (self.admin_user, None)
     
-    def tearDown(self):
-        """Clean up after tests."""
-        self.jwt_auth_patcher.stop()
-        super().tearDown()
+    def setUp(self):
+        """Set up per-test state."""
+        # force_authenticate bypasses the views' JWTCookieAuthentication
+        # without patching it; authenticate as admin by default
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
     
     def test_list_service_attributes_empty(self):
         """Test listing attributes when service has none."""
@@ -115,7 +103,9 @@ class ServiceAttributesAPITestCase(TestCase):
         )
         
         url = reverse('admin-attribute-list')
-        response = self.client.get(url)
+        # Auth lookups plus one query joining each attribute's service
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         data = response.json()
@@ -376,7 +366,7 @@ class ServiceAttributesAPITestCase(TestCase):
     def test_requires_admin_permission(self):
         """Test that attribute endpoints require admin permission."""
         # Authenticate as non-admin user
-        self.mock_jwt_auth.return_value = (self.test_user, None)
+        self.client.force_authenticate(user=self.test_user)
         
         # Mock RBACService to return no admin role
         with patch('identity_app.permissions.RBACService.get_user_roles') as mock_get_roles:
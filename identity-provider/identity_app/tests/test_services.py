@@ -2,33 +2,76 @@
 Tests for RBAC-ABAC services
 """
 
-from unittest.mock import patch, Mock, MagicMock
+import copy
+from unittest.mock import patch, DEFAULT, Mock, MagicMock
 from datetime import timedelta
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
+from django.db.models.signals import post_save, post_delete
 from django.utils import timezone
+from common.rbac_abac import UserAttributes
 from identity_app.models import (
-    Service, Role, UserRole, ServiceAttribute, UserAttribute
+    Service, Role, UserRole, ServiceAttribute, UserAttribute, ServiceManifest
 )
+from identity_app import signals
 from identity_app.services import (
     RBACService, AttributeService, RedisService, ManifestService
 )
 
 
+# identity_app receivers that refresh the Redis cache on each row change
+CACHE_SIGNAL_HANDLERS = [
+    (post_save, signals.handle_user_role_save, UserRole),
+    (post_delete, signals.handle_user_role_delete, UserRole),
+    (post_save, signals.handle_user_attribute_save, UserAttribute),
+    (post_delete, signals.handle_user_attribute_delete, UserAttribute),
+]
+
+
+def mute_cache_signals(test):
+    """
+    Disconnect the identity_app cache receivers for the rest of ``test``.
+    
+    Tests that only need the UserRole and UserAttribute rows use this to skip
+    the Redis refresh; receivers of other apps stay connected.
+    """
+    for signal, handler, sender in CACHE_SIGNAL_HANDLERS:
+        signal.disconnect(handler, sender=sender)
+        test.addCleanup(signal.connect, handler, sender=sender)
+
+
 class RBACServiceTest(TestCase):
     
-    def setUp(self):
-        self.user = User.objects.create_user('testuser', 'test@example.com', 'pass')
-        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass')
-        self.service = Service.objects.create(name='test_service', display_name='Test')
-        self.role = Role.objects.create(
-            service=self.service,
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Stub the Redis hooks once for the class; setUp resets the mocks
+        cls.redis_mocks = cls.enterClassContext(patch.multiple(
+            'identity_app.services.RedisService',
+            invalidate_user_cache=DEFAULT, populate_user_attributes=DEFAULT
+        ))
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.admin = User.objects.bulk_create([
+            User(username='testuser', email='test@example.com', password=make_password('pass')),
+            User(username='admin', email='admin@example.com', password=make_password('pass')),
+        ])
+        cls.service = Service.objects.create(name='test_service', display_name='Test')
+        cls.role = Role.objects.create(
+            service=cls.service,
             name='editor',
             display_name='Editor'
         )
     
+    def setUp(self):
+        for mock in self.redis_mocks.values():
+            mock.reset_mock()
+    
     def test_get_user_roles(self):
         """Test getting user roles."""
+        mute_cache_signals(self)
         # No roles initially
         roles = RBACService.get_user_roles(self.user)
         self.assertEqual(len(roles), 0)
@@ -40,7 +83,10 @@ class RBACServiceTest(TestCase):
             granted_by=self.admin
         )
         
-        roles = RBACService.get_user_roles(self.user)
+        # One query, with each role and its service joined in
+        with self.assertNumQueries(1):
+            roles = RBACService.get_user_roles(self.user)
+            self.assertEqual(roles[0].role.service.name, 'test_service')
         self.assertEqual(len(roles), 1)
         self.assertEqual(roles[0], user_role)
         
@@ -53,36 +99,36 @@ class RBACServiceTest(TestCase):
             granted_by=self.admin
         )
         
-        roles = RBACService.get_user_roles(self.user, self.service)
+        with self.assertNumQueries(1):
+            roles = RBACService.get_user_roles(self.user, self.service)
         self.assertEqual(len(roles), 1)
         self.assertEqual(roles[0].role, self.role)
     
     def test_get_user_roles_excludes_expired(self):
         """Test that expired roles are excluded."""
-        # Active role
-        UserRole.objects.create(
-            user=self.user,
-            role=self.role,
-            granted_by=self.admin,
-            expires_at=timezone.now() + timedelta(days=30)
-        )
-        
-        # Expired role
         expired_role = Role.objects.create(service=self.service, name='expired', display_name='Expired')
-        UserRole.objects.create(
-            user=self.user,
-            role=expired_role,
-            granted_by=self.admin,
-            expires_at=timezone.now() - timedelta(days=1)
-        )
+        UserRole.objects.bulk_create([
+            # Active role
+            UserRole(
+                user=self.user,
+                role=self.role,
+                granted_by=self.admin,
+                expires_at=timezone.now() + timedelta(days=30)
+            ),
+            # Expired role
+            UserRole(
+                user=self.user,
+                role=expired_role,
+                granted_by=self.admin,
+                expires_at=timezone.now() - timedelta(days=1)
+            ),
+        ])
         
         roles = RBACService.get_user_roles(self.user)
         self.assertEqual(len(roles), 1)
         self.assertEqual(roles[0].role.name, 'editor')
     
-    @patch('identity_app.services.RedisService.invalidate_user_cache')
-    @patch('identity_app.services.RedisService.populate_user_attributes')
-    def test_assign_role(self, mock_populate, mock_invalidate):
+    def test_assign_role(self):
         """Test assigning a role."""
         user_role = RBACService.assign_role(
             user=self.user,
@@ -98,11 +144,9 @@ class RBACServiceTest(TestCase):
         self.assertIsNotNone(user_role.expires_at)
         
         # Check Redis invalidation was called
-        mock_invalidate.assert_called_once_with(self.user.id, self.service.name)
+        self.redis_mocks['invalidate_user_cache'].assert_called_once_with(self.user.id, self.service.name)
     
-    @patch('identity_app.services.RedisService.invalidate_user_cache')
-    @patch('identity_app.services.RedisService.populate_user_attributes')
-    def test_revoke_role(self, mock_populate, mock_invalidate):
+    def test_revoke_role(self):
         """Test revoking a role."""
         # Create role assignment
         UserRole.objects.create(
@@ -115,18 +159,32 @@ class RBACServiceTest(TestCase):
         RBACService.revoke_role(self.user, self.role)
         
         # Check it's gone
-        self.assertEqual(UserRole.objects.filter(user=self.user).count(), 0)
+        self.assertFalse(UserRole.objects.filter(user=self.user).exists())
         
         # Check Redis invalidation
-        mock_invalidate.assert_called_once_with(self.user.id, self.service.name)
+        self.redis_mocks['invalidate_user_cache'].assert_called_once_with(self.user.id, self.service.name)
 
 
 class AttributeServiceTest(TestCase):
     
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Stub cache invalidation once for the class; setUp resets the mock
+        cls.mock_invalidate = cls.enterClassContext(
+            patch('identity_app.services.RedisService.invalidate_user_cache')
+        )
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.admin = User.objects.bulk_create([
+            User(username='testuser', email='test@example.com', password=make_password('pass')),
+            User(username='admin', email='admin@example.com', password=make_password('pass')),
+        ])
+        cls.service = Service.objects.create(name='test_service', display_name='Test')
+    
     def setUp(self):
-        self.user = User.objects.create_user('testuser', 'test@example.com', 'pass')
-        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass')
-        self.service = Service.objects.create(name='test_service', display_name='Test')
+        self.mock_invalidate.reset_mock()
     
     def test_get_user_attributes_empty(self):
         """Test getting attributes when none exist."""
@@ -135,6 +193,7 @@ class AttributeServiceTest(TestCase):
     
     def test_get_user_attributes_global(self):
         """Test getting global attributes."""
+        mute_cache_signals(self)
         # Create global attribute
         attr = UserAttribute.objects.create(
             user=self.user,
@@ -147,20 +206,21 @@ class AttributeServiceTest(TestCase):
     
     def test_get_user_attributes_with_service(self):
         """Test getting service-specific attributes."""
-        # Global attribute
-        UserAttribute.objects.create(
-            user=self.user,
-            name='department',
-            value='"Engineering"'
-        )
-        
-        # Service attribute
-        UserAttribute.objects.create(
-            user=self.user,
-            service=self.service,
-            name='access_level',
-            value='3'
-        )
+        UserAttribute.objects.bulk_create([
+            # Global attribute
+            UserAttribute(
+                user=self.user,
+                name='department',
+                value='"Engineering"'
+            ),
+            # Service attribute
+            UserAttribute(
+                user=self.user,
+                service=self.service,
+                name='access_level',
+                value='3'
+            ),
+        ])
         
         attrs = AttributeService.get_user_attributes(self.user, self.service)
         self.assertEqual(attrs, {
@@ -180,11 +240,12 @@ class AttributeServiceTest(TestCase):
             default_value='1'
         )
         
-        attrs = AttributeService.get_user_attributes(self.user, self.service)
+        # Global, service and required-attribute lookups, one query each
+        with self.assertNumQueries(3):
+            attrs = AttributeService.get_user_attributes(self.user, self.service)
         self.assertEqual(attrs, {'role_level': 1})
     
-    @patch('identity_app.services.RedisService.invalidate_user_cache')
-    def test_set_user_attribute(self, mock_invalidate):
+    def test_set_user_attribute(self):
         """Test setting a user attribute."""
         attr = AttributeService.set_user_attribute(
             user=self.user,
@@ -201,19 +262,10 @@ class AttributeServiceTest(TestCase):
         self.assertEqual(attr.updated_by, self.admin)
         
         # Check Redis invalidation
-        mock_invalidate.assert_called_once_with(self.user.id, self.service.name)
+        self.mock_invalidate.assert_called_once_with(self.user.id, self.service.name)
 
 
-class RedisServiceTest(TestCase):
-    
-    def setUp(self):
-        self.user = User.objects.create_user('testuser', 'test@example.com', 'pass')
-        self.service = Service.objects.create(name='test_service', display_name='Test')
-        self.role = Role.objects.create(
-            service=self.service,
-            name='editor',
-            display_name='Editor'
-        )
+class RedisServiceSingletonTest(SimpleTestCase):
     
     @patch('identity_app.services.RedisAttributeClient')
     def test_get_client(self, mock_client_class):
@@ -221,9 +273,12 @@ class RedisServiceTest(TestCase):
         mock_client = Mock()
         mock_client_class.return_value = mock_client
         
-        # Clear any existing client
-        if hasattr(RedisService, '_client'):
-            delattr(RedisService, '_client')
+        # Clear any existing client; stopping the patch puts it back (or
+        # drops the mocked one) so no state leaks into later tests
+        client_patcher = patch.object(RedisService, '_client', create=True)
+        client_patcher.start()
+        self.addCleanup(client_patcher.stop)
+        del RedisService._client
         
         client1 = RedisService.get_client()
         client2 = RedisService.get_client()
@@ -231,10 +286,26 @@ class RedisServiceTest(TestCase):
         # Should be same instance
         self.assertEqual(client1, client2)
         mock_client_class.assert_called_once()
+        # Keys cached before the per-user index are indexed once, on creation
+        mock_client.index_unindexed_user_keys.assert_called_once_with()
+
+
+class RedisServiceTest(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('testuser', 'test@example.com', 'pass')
+        cls.service = Service.objects.create(name='test_service', display_name='Test')
+        cls.role = Role.objects.create(
+            service=cls.service,
+            name='editor',
+            display_name='Editor'
+        )
     
     @patch('identity_app.services.RedisService.get_client')
     def test_populate_user_attributes(self, mock_get_client):
         """Test populating user attributes in Redis."""
+        mute_cache_signals(self)
         # Setup mock Redis client
         mock_client = Mock()
         mock_get_client.return_value = mock_client
@@ -256,15 +327,43 @@ class RedisServiceTest(TestCase):
         result = RedisService.populate_user_attributes(self.user.id, self.service.name)
         
         self.assertTrue(result)
-        mock_client.set_user_attributes.assert_called_once()
-        
-        # Check the attributes passed
-        call_args = mock_client.set_user_attributes.call_args
-        user_attrs = call_args[0][2]  # Third argument
-        self.assertEqual(user_attrs.user_id, self.user.id)
-        self.assertEqual(user_attrs.username, 'testuser')
-        self.assertEqual(user_attrs.roles, ['editor'])
-        self.assertEqual(user_attrs.department, 'Engineering')
+        
+        # Check the attributes passed; UserAttributes is a dataclass, so
+        # equality covers every field
+        mock_client.set_user_attributes.assert_called_once_with(
+            self.user.id, 'test_service',
+            UserAttributes(
+                user_id=self.user.id,
+                username='testuser',
+                email='test@example.com',
+                roles=['editor'],
+                department='Engineering',
+                service_specific_attrs={'department': 'Engineering'}
+            )
+        )
+    
+    @patch('identity_app.services.RedisService.get_client')
+    def test_populate_all_users_for_service(self, mock_get_client):
+        """Test populating every user of a service in one Redis call."""
+        mute_cache_signals(self)
+        mock_client = Mock()
+        mock_get_client.return_value = mock_client
+        mock_client.set_many_user_attributes.return_value = True
+        
+        other = User.objects.create_user('other', 'other@example.com', 'pass')
+        for user in (self.user, other):
+            UserRole.objects.create(user=user, role=self.role, granted_by=self.user)
+        
+        count = RedisService.populate_all_users_for_service(self.service.name)
+        
+        self.assertEqual(count, 2)
+        mock_client.set_many_user_attributes.assert_called_once()
+        service_name, user_attrs = mock_client.set_many_user_attributes.call_args[0]
+        self.assertEqual(service_name, 'test_service')
+        self.assertEqual(
+            sorted(attrs.username for attrs in user_attrs),
+            ['other', 'testuser']
+        )
     
     @patch('identity_app.services.RedisService.get_client')
     def test_invalidate_user_cache(self, mock_get_client):
@@ -281,42 +380,48 @@ class RedisServiceTest(TestCase):
 
 class ManifestServiceTest(TestCase):
     
-    def setUp(self):
-        self.manifest_data = {
-            'service': 'new_service',
+    MANIFEST_DATA = {
+        # The object form of 'service' carries the display name and description
+        'service': {
+            'name': 'new_service',
             'display_name': 'New Service',
-            'description': 'A new service',
-            'version': '1.0',
-            'roles': [
-                {
-                    'name': 'admin',
-                    'display_name': 'Administrator',
-                    'description': 'Full access',
-                    'is_global': True
-                },
-                {
-                    'name': 'viewer',
-                    'display_name': 'Viewer',
-                    'description': 'Read only access'
-                }
-            ],
-            'attributes': [
-                {
-                    'name': 'department',
-                    'display_name': 'Department',
-                    'description': 'User department',
-                    'type': 'string',
-                    'required': True,
-                    'default': 'General'
-                },
-                {
-                    'name': 'access_level',
-                    'display_name': 'Access Level',
-                    'type': 'integer',
-                    'required': False
-                }
-            ]
-        }
+            'description': 'A new service'
+        },
+        'version': '1.0',
+        'roles': [
+            {
+                'name': 'admin',
+                'display_name': 'Administrator',
+                'description': 'Full access',
+                'is_global': True
+            },
+            {
+                'name': 'viewer',
+                'display_name': 'Viewer',
+                'description': 'Read only access'
+            }
+        ],
+        'attributes': [
+            {
+                'name': 'department',
+                'display_name': 'Department',
+                'description': 'User department',
+                'type': 'string',
+                'required': True,
+                'default': 'General'
+            },
+            {
+                'name': 'access_level',
+                'display_name': 'Access Level',
+                'type': 'integer',
+                'required': False
+            }
+        ]
+    }
+    
+    def setUp(self):
+        # Tests may mutate nested lists, so each gets its own copy
+        self.manifest_data = copy.deepcopy(self.MANIFEST_DATA)
     
     @patch('identity_app.services.RedisService.populate_all_users_for_service')
     def test_register_manifest_new_service(self, mock_populate):
@@ -331,22 +436,24 @@ class ManifestServiceTest(TestCase):
         self.assertEqual(service.display_name, 'New Service')
         self.assertEqual(service.description, 'A new service')
         
-        # Check manifest
-        self.assertEqual(manifest.service, service)
-        self.assertEqual(manifest.version, 1)
-        self.assertTrue(manifest.is_active)
-        self.assertEqual(manifest.submitted_by_ip, '192.168.1.1')
+        # Check the returned summary and the stored manifest
+        self.assertEqual(manifest['service'], 'new_service')
+        self.assertEqual(manifest['version'], 1)
+        self.assertTrue(manifest['is_active'])
+        stored = ServiceManifest.objects.get(service=service, version=1)
+        self.assertTrue(stored.is_active)
+        self.assertEqual(stored.submitted_by_ip, '192.168.1.1')
         
         # Check roles created
-        roles = Role.objects.filter(service=service).order_by('name')
-        self.assertEqual(roles.count(), 2)
-        self.assertEqual(roles[0].name, 'admin')
-        self.assertEqual(roles[1].name, 'viewer')
-        
-        # Check attributes created
-        attrs = ServiceAttribute.objects.filter(service=service).order_by('name')
-        self.assertEqual(attrs.count(), 2)
-        self.assertEqual(attrs[1].name, 'department')
+        role_names = list(
+            Role.objects.filter(service=service).order_by('name').values_list('name', flat=True)
+        )
+        self.assertEqual(role_names, ['admin', 'viewer'])
+        
+        # Check attributes created; evaluated once since the default is
+        # read from the model
+        attrs = list(ServiceAttribute.objects.filter(service=service).order_by('name'))
+        self.assertEqual([attr.name for attr in attrs], ['access_level', 'department'])
         self.assertEqual(attrs[1].get_default_value(), 'General')
         
         # Check Redis population called
@@ -363,12 +470,14 @@ class ManifestServiceTest(TestCase):
         
         # Register first manifest
         first_manifest = ManifestService.register_manifest(self.manifest_data)
-        self.assertEqual(first_manifest.version, 1)
-        self.assertTrue(first_manifest.is_active)
+        
+        with self.subTest('initial'):
+            self.assertEqual(first_manifest['version'], 1)
+            self.assertTrue(first_manifest['is_active'])
         
         # Update manifest data
-        updated_data = self.manifest_data.copy()
-        updated_data['display_name'] = 'Updated Service'
+        updated_data = copy.deepcopy(self.manifest_data)
+        updated_data['service']['display_name'] = 'Updated Service'
         updated_data['roles'].append({
             'name': 'editor',
             'display_name': 'Editor'
@@ -377,20 +486,26 @@ class ManifestServiceTest(TestCase):
         # Register updated manifest
         second_manifest = ManifestService.register_manifest(updated_data)
         
-        # Check version incremented
-        self.assertEqual(second_manifest.version, 2)
-        self.assertTrue(second_manifest.is_active)
-        
-        # Check first manifest deactivated
-        first_manifest.refresh_from_db()
-        self.assertFalse(first_manifest.is_active)
-        
-        # Check service updated
-        service.refresh_from_db()
-        self.assertEqual(service.display_name, 'Updated Service')
-        
-        # Check new role added
-        self.assertEqual(Role.objects.filter(service=service).count(), 3)
+        with self.subTest('updated'):
+            # Check version incremented
+            self.assertEqual(second_manifest['version'], 2)
+            self.assertTrue(second_manifest['is_active'])
+            
+            # Check first manifest deactivated
+            self.assertFalse(
+                ServiceManifest.objects.get(service=service, version=1).is_active
+            )
+            
+            # Check service updated
+            service.refresh_from_db()
+            self.assertEqual(service.display_name, 'Updated Service')
+            
+            # Check new role added
+            self.assertQuerySetEqual(
+                Role.objects.filter(service=service).values_list('name', flat=True),
+                ['admin', 'editor', 'viewer'],
+                ordered=False
+            )
     
     def test_register_manifest_invalid_data(self):
         """Test registering manifest with invalid data."""
@@ -37,5 +37,10 @@ class DisableMigrations:
 
 MIGRATION_MODULES = DisableMigrations()
 
+# Use a fast password hasher; PBKDF2 dominates test setup time
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
 # Test-specific JWT secret
 JWT_SECRET = "test-secret-key"
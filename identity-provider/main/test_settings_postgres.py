@@ -0,0 +1,12 @@
+"""
+Test settings for running the identity provider suite against PostgreSQL.
+"""
+from .settings import *
+
+# The throwaway test database doesn't need each commit flushed to disk
+DATABASES["default"].setdefault("OPTIONS", {})["options"] = "-c synchronous_commit=off"
+
+# Use a fast password hasher; PBKDF2 dominates test setup time
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.MD5PasswordHasher",
+]
@@ -15,6 +15,10 @@ NC='\033[0m' # No Color
 # Default to running all tests
 TEST_TARGET=${1:-"identity_app.tests"}
 
+# Run against in-memory SQLite unless a settings module is given, e.g.
+# DJANGO_SETTINGS_MODULE=main.test_settings_postgres ./run_tests.sh to test on PostgreSQL
+TEST_SETTINGS=${DJANGO_SETTINGS_MODULE:-main.test_settings}
+
 # Check if we're in the right directory
 if [ ! -f "manage.py" ]; then
     echo -e "${RED}Error: manage.py not found. Please run this script from the identity-provider directory.${NC}"
@@ -24,7 +28,7 @@ fi
 # Function to run tests
 run_tests() {
     echo -e "${YELLOW}Running tests: $1${NC}"
-    python manage.py test $1 --verbosity=2
+    python manage.py test $1 --settings=$TEST_SETTINGS --verbosity=2
     return $?
 }
 
@@ -44,7 +48,7 @@ case "$1" in
         ;;
     "coverage")
         echo "Running tests with coverage..."
-        coverage run --source='identity_app' manage.py test identity_app.tests
+        coverage run --source='identity_app' manage.py test identity_app.tests --settings=$TEST_SETTINGS
         coverage report
         echo -e "${GREEN}HTML coverage report will be generated in htmlcov/${NC}"
         coverage html
@@ -55,7 +59,7 @@ case "$1" in
         python manage.py test \
             identity_app.tests.test_api_endpoints.LoginAPITestCase \
             identity_app.tests.test_admin_api_complete.UserViewSetTestCase.test_list_users \
-            --verbosity=1
+            --settings=$TEST_SETTINGS --verbosity=1
         ;;
     *)
         # Run specific test or all tests